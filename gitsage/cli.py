@@ -0,0 +1,69 @@
+# gitsage/cli.py
+
+import argparse
+import sys
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Git Sage - Repository analysis tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s https://github.com/pallets/flask
+  %(prog)s https://github.com/microsoft/vscode --mode api
+  %(prog)s git@github.com:user/repo.git --target-dir ./my-repos
+        """,
+    )
+
+    parser.add_argument("url", help="GitHub repository URL (https or ssh format)")
+
+    parser.add_argument(
+        "--mode",
+        choices=["clone", "api", "api_files"],
+        default="clone",
+        help="Fetch mode: 'clone' (git clone), 'api' (GitHub tarball) or 'api_files' (GitHub API, file by file) "
+        "[default: clone]",
+    )
+
+    parser.add_argument(
+        "--target-dir", default="./repos", help="Target directory for cloned repositories [default: ./repos]"
+    )
+
+    parser.add_argument(
+        "--token",
+        action="append",
+        dest="tokens",
+        help="GitHub token for API access (for private repos or higher rate limits); repeat to pool several tokens",
+    )
+
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep API tarballs, trees and blobs under <target-dir>/.gitsage-cache, pinned by commit sha; costs one "
+        "HEAD lookup per run and disk space per commit",
+    )
+
+    args = parser.parse_args()
+
+    # Imported after parsing: the fetcher pulls in requests and the optional HTTP backends, which --help and usage
+    # errors should not pay for.
+    from gitsage.repo_ingest.repo_fetcher import RepoFetcher
+    from gitsage.repo_ingest.repo_scanner import scan_repo
+
+    try:
+        cache_dir = Path(args.target_dir) / ".gitsage-cache"
+        fetcher = RepoFetcher(
+            repo_url=args.url,
+            mode=args.mode,
+            target_dir=args.target_dir,
+            tokens=args.tokens,
+            cache_dir=cache_dir if args.cache else None,
+        )
+        repo_path = fetcher.fetch()
+        _ = scan_repo(repo_path, cache_dir=cache_dir)
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,27 @@
+# gitsage/repo_ingest/_git.py
+
+import os
+from typing import Optional
+
+
+def read_head_sha(repo_path: str) -> Optional[str]:
+    # Resolves HEAD from the files under .git, which is far cheaper than spawning git for one sha.
+    git_dir = os.path.join(repo_path, ".git")
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            return head or None
+        ref = head[5:]
+        try:
+            with open(os.path.join(git_dir, ref)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            with open(os.path.join(git_dir, "packed-refs")) as f:
+                for line in f:
+                    sha, _, name = line.rstrip("\n").partition(" ")
+                    if name == ref:
+                        return sha
+    except OSError:
+        pass
+    return None
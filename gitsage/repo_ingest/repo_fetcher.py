@@ -1,31 +1,176 @@
 # gitsage/repo_ingest/repo_fetcher.py
 
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tarfile
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
+from urllib.parse import quote
 
 import requests
-from git.repo.base import Repo
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from ._git import read_head_sha
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+try:
+    import h2  # noqa: F401  # httpx needs it for http2=True
+    import httpx
+except ImportError:
+    httpx = None
+
+_GITHUB_HOSTS = ("https://api.github.com", "https://codeload.github.com", "https://raw.githubusercontent.com")
+_CHUNK_SIZE = 64 * 1024
+_RATE_LIMIT = 5000  # primary REST budget per token and hour
+_GRAPHQL_BATCH = 50
+_GRAPHQL_BLOB_FIELDS = "... on Blob { oid isBinary isTruncated text }"
+_RAW_MEDIA_TYPE = {"Accept": "application/vnd.github.raw"}
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_EXTRACT_KWARGS = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+
+class CloneError(RuntimeError):
+    pass
 
 
 class RepoFetcher:
-    def __init__(self, repo_url: str, mode: str = "clone", target_dir: str = "./repos", token: Optional[str] = None):
+    def __init__(
+        self,
+        repo_url: str,
+        mode: str = "clone",
+        target_dir: str = "./repos",
+        token: Optional[str] = None,
+        depth: Optional[int] = 1,
+        max_concurrency: int = 16,
+        blobless: bool = False,
+        cache_dir: Optional[str] = None,
+        tokens: Optional[list[str]] = None,
+        update: bool = False,
+    ):
         self.repo_url = repo_url
+        self._owner, self._repo = self._parse_owner_repo(repo_url)
         self.mode = mode
         self.target_dir = Path(target_dir)
-        self.token = token
+        self.tokens = list(tokens) if tokens else ([token] if token else [])
+        self.token = self.tokens[0] if self.tokens else None
+        self.depth = depth  # None clones the full history
+        self.max_concurrency = max_concurrency
+        self.blobless = blobless  # partial clone: blobs are fetched lazily on checkout
+        self.update = update  # refresh existing clones whose HEAD is behind the remote
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None  # API responses pinned by commit sha
+        self._token_state = {tok: {"remaining": _RATE_LIMIT, "reset": 0.0} for tok in self.tokens}
+        self._token_lock = threading.Lock()
+        self._session = self._make_session()
+
+    def _auth_headers(self) -> dict[str, str]:
+        return {"Authorization": f"token {self.token}"} if self.token else {}
+
+    def _make_session(self) -> requests.Session:
+        # One pooled session keeps a warm TLS connection per host; tarball requests redirect to codeload.
+        session = requests.Session()
+        session.headers.update(self._auth_headers())
+        adapter = HTTPAdapter(
+            pool_connections=len(_GITHUB_HOSTS),
+            pool_maxsize=32,
+            # raise_on_status=False hands back the last response once retries run out, so callers can skip the blob.
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=_RETRY_STATUSES, raise_on_status=False),
+        )
+        for host in _GITHUB_HOSTS:
+            session.mount(host, adapter)
+        return session
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        send = getattr(self._session, method)
+        if len(self.tokens) < 2:
+            return send(url, **kwargs)
+        token, kwargs["headers"] = self._authorize(kwargs.get("headers", {}))
+        res = send(url, **kwargs)
+        self._record_response(token, res.headers)
+        return res
+
+    def _authorize(self, headers: dict[str, str]) -> tuple[Optional[str], dict[str, str]]:
+        # A single token rides on the session or client headers; a pool picks the token with the most budget left
+        # per request, whichever backend sends it.
+        if len(self.tokens) < 2:
+            return None, headers
+        with self._token_lock:
+            token = self._pick_token()
+        return token, {**headers, "Authorization": f"token {token}"}
+
+    def _record_response(self, token: Optional[str], headers) -> None:
+        if token is not None:
+            with self._token_lock:
+                self._record_rate_limit(token, headers)
+
+    def _pick_token(self) -> str:
+        token, state = max(self._token_state.items(), key=lambda item: item[1]["remaining"])
+        if state["remaining"] > 0:
+            return token
+        token, state = min(self._token_state.items(), key=lambda item: item[1]["reset"])
+        delay = state["reset"] - time.time()
+        if delay > 0:
+            logger.warning(f"All GitHub tokens are rate limited; sleeping {delay:.0f}s until the earliest reset")
+            time.sleep(delay)
+        state["remaining"] = _RATE_LIMIT
+        return token
+
+    def _record_rate_limit(self, token: str, headers) -> None:
+        # Only the REST ("core") budget is tracked; GraphQL reports its own points budget in the same headers.
+        if headers.get("X-RateLimit-Resource", "core") != "core":
+            return
+        state = self._token_state[token]
+        try:
+            if "X-RateLimit-Remaining" in headers:
+                state["remaining"] = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                state["reset"] = float(headers["X-RateLimit-Reset"])
+        except (TypeError, ValueError):
+            pass
 
     def fetch(self) -> str:
         if self.mode == "clone":
             return self._clone_repo()
         elif self.mode == "api":
             return self._download_via_api()
+        elif self.mode == "api_files":
+            return self._download_via_api_files()
         else:
-            raise ValueError("Unsupported mode. Use 'clone' or 'api'.")
+            raise ValueError("Unsupported mode. Use 'clone', 'api' or 'api_files'.")
+
+    async def afetch(self) -> str:
+        # Clones and downloads block on the network, so they run in a worker thread and leave the loop free.
+        return await asyncio.to_thread(self.fetch)
 
     def _extract_repo_name(self) -> str:
-        return self.repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+        return self._repo
+
+    @staticmethod
+    def _parse_owner_repo(repo_url: str) -> tuple[str, str]:
+        # scp-style SSH URLs ("git@github.com:owner/repo.git") separate host and path with a colon.
+        parts = repo_url.rstrip("/").removesuffix(".git").replace(":", "/").split("/")
+        return (parts[-2] if len(parts) > 1 else ""), parts[-1]
 
     def _clone_repo(self) -> str:
         self.target_dir.mkdir(parents=True, exist_ok=True)
@@ -33,37 +178,462 @@ class RepoFetcher:
         repo_path = self.target_dir / repo_name
 
         if repo_path.exists():
-            logger.info(f"Repository already exists at {repo_path.as_posix()}")
+            is_clone = (repo_path / ".git" / "HEAD").is_file()
+            if self.update and is_clone:
+                self._update_clone(repo_path)
+            else:
+                if not is_clone:
+                    logger.warning(
+                        f"{repo_path.as_posix()} has no .git/HEAD and may be a half-finished clone; "
+                        "delete it to clone again"
+                    )
+                logger.info(f"Repository already exists at {repo_path.as_posix()}")
             return str(repo_path)
 
         logger.info(f"Cloning {self.repo_url} into {repo_path.as_posix()} ...")
-        Repo.clone_from(self.repo_url, str(repo_path))
+        # libgit2 has no partial clone and no ssh-agent or git config (credential helpers, insteadOf, proxies), so
+        # blobless clones and anything but plain https URLs always go through git.
+        if pygit2 is not None and not self.blobless and self.repo_url.startswith("https://"):
+            self._clone_with_pygit2(repo_path)
+        else:
+            self._clone_with_git(repo_path)
         logger.success(f"Repository cloned successfully to {repo_path.as_posix()}")
         return str(repo_path)
 
+    def _clone_with_pygit2(self, repo_path: Path) -> None:
+        # libgit2 clones in-process, saving the git fork/exec on every repository.
+        try:
+            pygit2.clone_repository(self.repo_url, str(repo_path), depth=self.depth or 0)
+        except pygit2.GitError as e:
+            # git may still succeed where libgit2 cannot, e.g. with credentials only a helper provides.
+            logger.warning(f"pygit2 could not clone {self.repo_url} ({e}); retrying with git")
+            shutil.rmtree(repo_path, ignore_errors=True)
+            self._clone_with_git(repo_path)
+
+    def _clone_with_git(self, repo_path: Path) -> None:
+        # Protocol v2 (default only from git 2.26) filters the ref advertisement to what the clone asks for.
+        cmd = ["git", "-c", "protocol.version=2", "clone"]
+        if self.depth is not None:
+            cmd += ["--depth", str(self.depth), "--single-branch", "--no-tags"]
+        if self.blobless:
+            cmd += ["--filter=blob:none"]
+        cmd += ["--", self.repo_url, str(repo_path)]
+        self._run_git(cmd, "clone")
+
+    def _update_clone(self, repo_path: Path) -> None:
+        # Comparing ls-remote against the local HEAD costs one round trip; a stale clone is then brought up to
+        # date with a shallow fetch instead of a fresh clone.
+        ls_remote = self._run_git(["git", "ls-remote", "--", self.repo_url, "HEAD"], "update")
+        remote = ls_remote.stdout.split("\t", 1)[0]
+        if remote and remote == read_head_sha(str(repo_path)):
+            logger.info(f"Repository already up to date at {repo_path.as_posix()}")
+            return
+
+        logger.info(f"Updating {repo_path.as_posix()} to {remote or 'remote HEAD'} ...")
+        cmd = ["git", "-C", str(repo_path), "-c", "protocol.version=2", "fetch", "--no-tags"]
+        if self.depth is not None:
+            cmd += ["--depth", str(self.depth)]
+        self._run_git(cmd + ["origin", "HEAD"], "update")
+        # --keep refuses to overwrite local edits instead of silently discarding them.
+        self._run_git(["git", "-C", str(repo_path), "reset", "--keep", "FETCH_HEAD"], "update")
+        logger.success(f"Repository updated at {repo_path.as_posix()}")
+
+    def _run_git(self, cmd: list[str], action: str) -> subprocess.CompletedProcess:
+        try:
+            return subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise CloneError(f"Failed to {action} {self.repo_url}: {e.stderr.strip()}") from e
+        except FileNotFoundError as e:
+            raise CloneError("git executable not found; install git to use clone mode") from e
+
     def _download_via_api(self) -> str:
-        headers = {}
+        owner, repo = self._owner, self._repo
+        sha = self._resolve_head_sha(owner, repo) if self.cache_dir is not None else None
+        api_url = f"https://api.github.com/repos/{owner}/{repo}/tarball/{sha or 'HEAD'}"
+
+        if sha is None:
+            logger.info(f"Fetching GitHub tarball via API: {api_url}")
+            res = self._request("get", api_url, stream=True)
+            res.raise_for_status()
+            temp_dir = Path(tempfile.mkdtemp(prefix=f"{repo}-"))
+            with res:
+                _extract_tarball(res.raw, temp_dir)
+        else:
+            # A tarball pinned to a commit sha never changes, so a cached copy is always valid.
+            tarball = self.cache_dir / "tarballs" / f"{owner}-{repo}-{sha}.tar.gz"
+            if tarball.exists():
+                logger.info(f"Using cached tarball {tarball.as_posix()}")
+            else:
+                logger.info(f"Fetching GitHub tarball via API: {api_url}")
+                res = self._request("get", api_url, stream=True)
+                res.raise_for_status()
+                with res:
+                    _store(tarball, res.raw)
+            temp_dir = Path(tempfile.mkdtemp(prefix=f"{repo}-"))
+            with open(tarball, "rb") as f:
+                _extract_tarball(f, temp_dir)
+        logger.success(f"Repo downloaded to temp dir: {temp_dir.as_posix()}")
+        return str(temp_dir)
+
+    def iter_files(self) -> Iterator[tuple[Path, bytes]]:
+        # Blobs are yielded in completion order, so a consumer can parse while the rest are still downloading.
+        ref, blob_shas = self._list_blobs()
+        temp_dir = Path(tempfile.mkdtemp(prefix=f"{self._repo}-"))
+        for blob_path in self._iter_blobs(ref, blob_shas, temp_dir):
+            local_path = temp_dir / blob_path
+            yield local_path, local_path.read_bytes()
+
+    def _download_via_api_files(self) -> str:
+        ref, blob_shas = self._list_blobs()
+        temp_dir = Path(tempfile.mkdtemp(prefix=f"{self._repo}-"))
+        for _ in self._iter_blobs(ref, blob_shas, temp_dir):
+            pass
+        logger.success(f"Repo downloaded to temp dir: {temp_dir.as_posix()}")
+        return str(temp_dir)
+
+    def _list_blobs(self) -> tuple[str, dict[str, Optional[str]]]:
+        owner, repo = self._owner, self._repo
+        ref = (self._resolve_head_sha(owner, repo) if self.cache_dir is not None else None) or "HEAD"
+        api_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{ref}?recursive=1"
+        tree_cache = self._cache_entry("trees", api_url) if ref != "HEAD" else None
+        if tree_cache is not None and tree_cache.exists():
+            logger.info(f"Using cached GitHub tree {tree_cache.as_posix()}")
+            tree = json.loads(tree_cache.read_bytes()).get("tree", [])
+        else:
+            logger.info(f"Fetching GitHub tree via API: {api_url}")
+            res = self._request("get", api_url)
+            res.raise_for_status()
+            if tree_cache is not None:
+                _store(tree_cache, io.BytesIO(res.content))
+            tree = res.json().get("tree", [])
+        return ref, {item["path"]: item.get("sha") for item in tree if item["type"] == "blob"}
+
+    def _iter_blobs(self, ref: str, blob_shas: dict[str, Optional[str]], temp_dir: Path) -> Iterator[str]:
+        owner, repo = self._owner, self._repo
+        blob_paths = list(blob_shas)
+        _make_parent_dirs(temp_dir, blob_paths)
+        if self.cache_dir is not None:
+            remaining = self._restore_cached_blobs(blob_shas, temp_dir)
+            yield from _finished(blob_paths, remaining)
+            blob_paths = remaining
+        fetched_paths = blob_paths
         if self.token:
-            headers["Authorization"] = f"token {self.token}"
+            remaining = self._download_blobs_graphql(owner, repo, ref, blob_paths, temp_dir)
+            yield from _finished(blob_paths, remaining)
+            blob_paths = remaining
+        yield from self._download_blobs(ref, blob_paths, temp_dir)
+        if self.cache_dir is not None:
+            self._cache_blobs(blob_shas, fetched_paths, temp_dir)
 
-        owner, repo = self.repo_url.rstrip("/").split("/")[-2:]
-        repo = repo.replace(".git", "")  # Remove .git extension if present
-        api_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/HEAD?recursive=1"
-        logger.info(f"Fetching GitHub tree via API: {api_url}")
-        res = requests.get(api_url, headers=headers)
-        res.raise_for_status()
+    def _download_blobs(self, ref: str, blob_paths: list[str], temp_dir: Path) -> Iterator[str]:
+        owner, repo = self._owner, self._repo
+        if httpx is not None:
+            # HTTP/2 multiplexes every blob request over one connection per host instead of a socket per worker.
+            # The pool is still sized for the workers in case a host only speaks HTTP/1.1.
+            limits = httpx.Limits(max_connections=self.max_concurrency)
+            with httpx.Client(http2=True, follow_redirects=True, headers=self._auth_headers(), limits=limits) as client:
+                yield from self._fetch_all(
+                    lambda blob_path: self._fetch_one_http2(client, ref, blob_path, temp_dir), blob_paths
+                )
+        elif aiohttp is not None:
+            # The event loop runs on a worker thread, which also works when the caller is inside a loop already.
+            done = queue.SimpleQueue()
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(
+                    asyncio.run, self._adownload_blobs(owner, repo, blob_paths, temp_dir, ref, on_done=done.put)
+                )
+                future.add_done_callback(lambda _: done.put(None))
+                while (blob_path := done.get()) is not None:
+                    yield blob_path
+                future.result()
+        else:
+            yield from self._fetch_all(
+                lambda blob_path: self._fetch_one(owner, repo, ref, blob_path, temp_dir), blob_paths
+            )
 
-        tree = res.json().get("tree", [])
-        temp_dir = Path(tempfile.mkdtemp(prefix=f"{repo}-"))
-        for item in tree:
-            if item["type"] == "blob":
-                file_url = f"https://raw.githubusercontent.com/{owner}/{repo}/HEAD/{item['path']}"
-                local_path = temp_dir / item["path"]
-                local_path.parent.mkdir(parents=True, exist_ok=True)
-                file_res = requests.get(file_url, headers=headers)
+    def _fetch_all(self, fetch: Callable[[str], bool], blob_paths: list[str]) -> Iterator[str]:
+        if self.max_concurrency > 1 and len(blob_paths) > 1:
+            # Threads on one pooled client overlap the network waits.
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                futures = {executor.submit(fetch, blob_path): blob_path for blob_path in blob_paths}
+                for future in as_completed(futures):
+                    if future.result():
+                        yield futures[future]
+        else:
+            for blob_path in blob_paths:
+                if fetch(blob_path):
+                    yield blob_path
+
+    def _fetch_one(self, owner: str, repo: str, ref: str, blob_path: str, temp_dir: Path) -> bool:
+        file_url, headers = self._blob_request(owner, repo, ref, blob_path)
+        with self._request("get", file_url, stream=True, headers=headers) as file_res:
+            if file_res.status_code == 200:
+                # Copy in fixed chunks so a large blob never sits in memory whole.
+                file_res.raw.decode_content = True
+                with open(f"{temp_dir}/{blob_path}", "wb") as f:
+                    shutil.copyfileobj(file_res.raw, f, _CHUNK_SIZE)
+                return True
+            logger.warning(f"Skipped: {file_url} ({file_res.status_code})")
+            return False
+
+    def _fetch_one_http2(self, client, ref: str, blob_path: str, temp_dir: Path) -> bool:
+        file_url, headers = self._blob_request(self._owner, self._repo, ref, blob_path)
+        token, headers = self._authorize(headers)
+        try:
+            with client.stream("GET", file_url, headers=headers) as file_res:
+                self._record_response(token, file_res.headers)
                 if file_res.status_code == 200:
-                    local_path.write_bytes(file_res.content)
-                else:
+                    with open(f"{temp_dir}/{blob_path}", "wb") as f:
+                        for chunk in file_res.iter_bytes(_CHUNK_SIZE):
+                            f.write(chunk)
+                    return True
+                if file_res.status_code not in _RETRY_STATUSES:
                     logger.warning(f"Skipped: {file_url} ({file_res.status_code})")
-        logger.success(f"Repo downloaded to temp dir: {temp_dir.as_posix()}")
-        return str(temp_dir)
+                    return False
+        except httpx.TransportError:
+            pass
+        # Rate limits, server errors and connection or pool failures go to the requests session, which retries them.
+        return self._fetch_one(self._owner, self._repo, ref, blob_path, temp_dir)
+
+    def _blob_request(self, owner: str, repo: str, ref: str, blob_path: str) -> tuple[str, dict[str, str]]:
+        # With a token the contents API serves raw bytes gzip-compressed, at one REST call per blob against the
+        # token's budget; anonymously it allows only 60 calls an hour.
+        if not self.token:
+            return _raw_url(owner, repo, ref, blob_path), {}
+        return f"https://api.github.com/repos/{owner}/{repo}/contents/{quote(blob_path)}?ref={ref}", _RAW_MEDIA_TYPE
+
+    def _cache_entry(self, kind: str, url: str) -> Path:
+        return self.cache_dir / kind / hashlib.sha256(url.encode()).hexdigest()
+
+    def _resolve_head_sha(self, owner: str, repo: str) -> str:
+        # If-None-Match revalidation answers 304 while HEAD is unchanged, which costs no primary rate limit.
+        url = f"https://api.github.com/repos/{owner}/{repo}/commits/HEAD"
+        entry_file = self._cache_entry("refs", url)
+        try:
+            entry = json.loads(entry_file.read_bytes())
+        except (OSError, ValueError):
+            entry = None
+
+        headers = {"Accept": "application/vnd.github.sha"}
+        if entry is not None:
+            headers["If-None-Match"] = entry["etag"]
+        res = self._request("get", url, headers=headers)
+        if res.status_code == 304 and entry is not None:
+            return entry["sha"]
+        res.raise_for_status()
+
+        sha = res.text.strip()
+        etag = res.headers.get("ETag")
+        if etag:
+            _store(entry_file, io.BytesIO(json.dumps({"etag": etag, "sha": sha}).encode()))
+        return sha
+
+    def _download_blobs_graphql(
+        self, owner: str, repo: str, ref: str, blob_paths: list[str], temp_dir: Path
+    ) -> list[str]:
+        # GraphQL needs a token but returns a whole batch of text blobs per request. Binary, truncated or failed
+        # blobs are handed back for the raw download, and so is text GitHub decoded lossily: its bytes no longer
+        # hash to the blob oid.
+        remaining = []
+        for start in range(0, len(blob_paths), _GRAPHQL_BATCH):
+            end = start + _GRAPHQL_BATCH
+            batch = blob_paths[start:end]
+            fields = " ".join(
+                f"f{i}: object(expression: {json.dumps(f'{ref}:{path}')}) {{ {_GRAPHQL_BLOB_FIELDS} }}"
+                for i, path in enumerate(batch)
+            )
+            query = (
+                f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {fields} }} }}"
+            )
+            res = self._request(
+                "post",
+                "https://api.github.com/graphql",
+                json={"query": query, "variables": {"owner": owner, "name": repo}},
+            )
+            objects = {}
+            if res.status_code == 200:
+                objects = (res.json().get("data") or {}).get("repository") or {}
+            for i, blob_path in enumerate(batch):
+                blob = objects.get(f"f{i}")
+                if not blob or blob.get("isBinary") or blob.get("isTruncated") or blob.get("text") is None:
+                    remaining.append(blob_path)
+                    continue
+                data = blob["text"].encode()
+                if _git_blob_sha_of(data) != blob.get("oid"):
+                    remaining.append(blob_path)
+                    continue
+                with open(f"{temp_dir}/{blob_path}", "wb") as f:
+                    f.write(data)
+        return remaining
+
+    def _restore_cached_blobs(self, blob_shas: dict[str, Optional[str]], temp_dir: Path) -> list[str]:
+        # Blobs are stored under their git object sha, so files unchanged between commits are never re-downloaded.
+        # Per-blob paths are joined as strings; a Path join costs several times the string format here.
+        blob_dir = f"{self.cache_dir}/blobs"
+        missing = []
+        for blob_path, sha in blob_shas.items():
+            cached = f"{blob_dir}/{sha}" if sha else None
+            if cached is not None and os.path.exists(cached):
+                shutil.copyfile(cached, f"{temp_dir}/{blob_path}")
+            else:
+                missing.append(blob_path)
+        return missing
+
+    def _cache_blobs(self, blob_shas: dict[str, Optional[str]], blob_paths: list[str], temp_dir: Path) -> None:
+        for blob_path in blob_paths:
+            sha = blob_shas[blob_path]
+            local_path = f"{temp_dir}/{blob_path}"
+            # Only content that hashes to the tree's sha is stored.
+            if sha and os.path.isfile(local_path) and _git_blob_sha(local_path) == sha:
+                with open(local_path, "rb") as f:
+                    _store(self.cache_dir / "blobs" / sha, f)
+
+    async def _adownload_blobs(
+        self,
+        owner: str,
+        repo: str,
+        blob_paths: list[str],
+        temp_dir: Path,
+        ref: str = "HEAD",
+        on_done: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        # Blob downloads are pure network waits, so they fan out over one session instead of running back to back.
+        sem = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(session, blob_path: str) -> None:
+            if await self._fetch_blob(session, sem, owner, repo, blob_path, temp_dir, ref) and on_done is not None:
+                on_done(blob_path)
+
+        async with aiohttp.ClientSession(headers=self._auth_headers()) as session:
+            await asyncio.gather(*(fetch(session, blob_path) for blob_path in blob_paths))
+
+    async def _fetch_blob(
+        self, session, sem: asyncio.Semaphore, owner: str, repo: str, blob_path: str, temp_dir: Path, ref: str
+    ) -> bool:
+        file_url, headers = self._blob_request(owner, repo, ref, blob_path)
+        async with sem:
+            token = None
+            if len(self.tokens) > 1:
+                # An exhausted pool sleeps until the earliest reset, which must not stall the event loop.
+                token, headers = await asyncio.to_thread(self._authorize, headers)
+            try:
+                async with session.get(file_url, headers=headers) as file_res:
+                    self._record_response(token, file_res.headers)
+                    if file_res.status == 200:
+                        # Disk writes run in worker threads so a slow disk never blocks the other downloads.
+                        f = await asyncio.to_thread(open, f"{temp_dir}/{blob_path}", "wb")
+                        try:
+                            async for chunk in file_res.content.iter_chunked(_CHUNK_SIZE):
+                                await asyncio.to_thread(f.write, chunk)
+                        finally:
+                            await asyncio.to_thread(f.close)
+                        return True
+                    if file_res.status not in _RETRY_STATUSES:
+                        logger.warning(f"Skipped: {file_url} ({file_res.status})")
+                        return False
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            # Rate limits, server errors and connection failures go to the requests session, which retries them.
+            return await asyncio.to_thread(self._fetch_one, owner, repo, ref, blob_path, temp_dir)
+
+
+def _raw_url(owner: str, repo: str, ref: str, blob_path: str) -> str:
+    return f"https://raw.githubusercontent.com/{owner}/{repo}/{ref}/{blob_path}"
+
+
+def _git_blob_sha(path: str) -> str:
+    # Git object ids hash a "blob <size>\0" header ahead of the content.
+    h = hashlib.sha1(b"blob %d\0" % os.stat(path).st_size)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _git_blob_sha_of(data: bytes) -> str:
+    h = hashlib.sha1(b"blob %d\0" % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+
+def _store(dest: Path, src) -> None:
+    # Write next to the destination and rename, so a crash never leaves a truncated cache entry behind.
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dest.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(src, f)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _extract_tarball(fileobj, temp_dir: Path) -> None:
+    # "r|gz" reads the archive as a stream and never buffers the whole tarball.
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tf:
+        for member in tf:
+            if not _strip_top_dir(member):
+                continue
+            tf.extract(member, temp_dir, **_EXTRACT_KWARGS)
+
+
+def _strip_top_dir(member: tarfile.TarInfo) -> bool:
+    # GitHub wraps the tree in a single "{owner}-{repo}-{sha}/" directory. Only plain files and directories that
+    # stay inside the extraction root are kept.
+    _, _, rel_path = member.name.partition("/")
+    if not rel_path or not (member.isfile() or member.isdir()):
+        return False
+    if rel_path.startswith("/") or ".." in rel_path.split("/"):
+        return False
+    member.name = rel_path
+    return True
+
+
+def _finished(blob_paths: list[str], remaining: list[str]) -> Iterator[str]:
+    left = set(remaining)
+    return (blob_path for blob_path in blob_paths if blob_path not in left)
+
+
+def _make_parent_dirs(temp_dir: Path, blob_paths: list[str]) -> None:
+    # One mkdir per distinct directory up front instead of one per file; sorting puts parents first.
+    for parent in sorted({blob_path.rpartition("/")[0] for blob_path in blob_paths} - {""}):
+        (temp_dir / parent).mkdir(parents=True, exist_ok=True)
+
+
+def clone_repos(
+    repo_urls: Iterable[str], target_dir: str = "./repos", max_workers: int = 8, **fetcher_kwargs
+) -> dict[str, str]:
+    # Clones are network-bound and run in git subprocesses, so threads are enough. URLs that map to the same
+    # local repo name share a worker so they never clone into the same directory at once.
+    groups: dict[str, list[RepoFetcher]] = {}
+    for repo_url in dict.fromkeys(repo_urls):
+        fetcher = RepoFetcher(repo_url, mode="clone", target_dir=target_dir, **fetcher_kwargs)
+        groups.setdefault(fetcher._extract_repo_name(), []).append(fetcher)
+
+    def clone_group(fetchers: list[RepoFetcher]) -> list[tuple[str, str]]:
+        return [(fetcher.repo_url, fetcher.fetch()) for fetcher in fetchers]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(pair for pairs in executor.map(clone_group, groups.values()) for pair in pairs)
+
+
+async def fetch_many(repo_urls: Iterable[str], max_concurrency: int = 4, **fetcher_kwargs) -> list[str]:
+    # Bounded so many parallel fetches do not saturate a slow link; same-named repos share one task, as in
+    # clone_repos, so they never write into the same directory at once.
+    fetchers = [RepoFetcher(repo_url, **fetcher_kwargs) for repo_url in repo_urls]
+    groups: dict[str, list[int]] = {}
+    for i, fetcher in enumerate(fetchers):
+        groups.setdefault(fetcher._extract_repo_name(), []).append(i)
+
+    sem = asyncio.Semaphore(max_concurrency)
+    results: list[Optional[str]] = [None] * len(fetchers)
+
+    async def fetch_group(indices: list[int]) -> None:
+        async with sem:
+            for i in indices:
+                results[i] = await fetchers[i].afetch()
+
+    await asyncio.gather(*(fetch_group(indices) for indices in groups.values()))
+    return results
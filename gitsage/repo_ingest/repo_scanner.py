@@ -1,9 +1,20 @@
+import contextlib
+import functools
+import hashlib
+import json
 import os
+import subprocess
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Union
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 from loguru import logger
 
+from ._git import read_head_sha
+
 SUPPORTED_CODE_EXTS = {".py", ".js", ".ts", ".cpp", ".java", ".go"}
 SUPPORTED_CONFIG_FILES = {
     "README.md",
@@ -33,20 +44,371 @@ SUPPORTED_CONFIG_FILES = {
 }
 
 
-def scan_repo(repo_path: Union[str, Path]) -> dict[str, list[str]]:
-    repo_path = Path(repo_path)
+_CODE_EXTS = frozenset(SUPPORTED_CODE_EXTS)
+_CONFIG_FILES = frozenset(SUPPORTED_CONFIG_FILES)
+_RACY_MTIME_NS = 2_000_000_000  # covers 2 s FAT and 1 s HFS+ timestamps as well as jiffy-granular kernels
+_PARALLEL_MIN_DIRS = 4  # pending directories before a threaded walk is worth starting the pool
+_SKIP_DIRS = frozenset(
+    {
+        ".git",
+        "node_modules",
+        "__pycache__",
+        ".venv",
+        "venv",
+        ".mypy_cache",
+        ".pytest_cache",
+        "dist",
+        "build",
+        ".tox",
+        "target",  # Rust and Maven build output
+    }
+)
+
+
+def _scan_dir(
+    path: str, exclude_dirs: frozenset[str], dir_append, code_append, config_append, entries: bool = False
+) -> None:
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in exclude_dirs:
+                        dir_append(entry.path)
+                    continue
+                name = entry.name
+                # dot > 0 mirrors Path.suffix: dotfiles like ".gitignore" have no extension
+                dot = name.rfind(".")
+                ext = name[dot:] if dot > 0 else ""
+                if ext in _CODE_EXTS:
+                    code_append(entry if entries else entry.path)
+                elif name in _CONFIG_FILES:
+                    config_append(entry if entries else entry.path)
+    except OSError:
+        pass
+
+
+def _scan_dir_task(
+    path: str, exclude_dirs: frozenset[str], entries: bool = False
+) -> tuple[list[str], list[str], list[str]]:
+    subdirs, code_files, config_files = [], [], []
+    _scan_dir(path, exclude_dirs, subdirs.append, code_files.append, config_files.append, entries)
+    return subdirs, code_files, config_files
+
+
+def _scan_dir_cached(
+    path: str, exclude_dirs: frozenset[str], dir_cache: dict
+) -> tuple[list[str], list[str], list[str]]:
+    # A directory's mtime only moves when entries are added, removed or renamed in it, so an unchanged mtime keeps
+    # its own listing valid. Subdirectories are still visited, and each revalidates with its own stat.
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return [], [], []
+    cached = dir_cache.get(path)
+    if cached is not None and cached[0] == mtime_ns and cached[1] == exclude_dirs:
+        return cached[2]
+    listing = _scan_dir_task(path, exclude_dirs)
+    # As with racy git, an entry added within the same timestamp tick leaves the mtime unchanged, so a directory
+    # modified just now is re-listed on every scan until its mtime is safely in the past.
+    if time.time_ns() - mtime_ns >= _RACY_MTIME_NS:
+        dir_cache[path] = (mtime_ns, exclude_dirs, listing)
+    else:
+        dir_cache.pop(path, None)
+    return listing
+
+
+def _iter_parallel(
+    roots: Iterable[str], exclude_dirs: frozenset[str], max_workers: int, entries: bool = False
+) -> Iterator[tuple[list[str], list[str]]]:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_scan_dir_task, root, exclude_dirs, entries) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, code_hits, config_hits = future.result()
+                pending.update(executor.submit(_scan_dir_task, subdir, exclude_dirs, entries) for subdir in subdirs)
+                yield code_hits, config_hits
+
+
+def _iter_walk(
+    root: str, exclude_dirs: frozenset[str], max_workers: int, entries: bool = False, dir_cache: Optional[dict] = None
+) -> Iterator[tuple[list[str], list[str]]]:
+    queue = deque([root])
+    _popleft = queue.popleft
+    _append = queue.append
+    if dir_cache is not None:
+        # A warm re-scan is one stat per directory, which leaves nothing for a thread pool to overlap.
+        while queue:
+            subdirs, code_hits, config_hits = _scan_dir_cached(_popleft(), exclude_dirs, dir_cache)
+            queue.extend(subdirs)
+            if code_hits or config_hits:
+                yield code_hits, config_hits
+        return
+    while queue:
+        if max_workers > 1 and len(queue) > _PARALLEL_MIN_DIRS:
+            # Threads only pay off when directory reads block (cold caches, network or FUSE mounts), and only
+            # once there is enough pending work; small trees finish on this thread before the pool would start.
+            yield from _iter_parallel(queue, exclude_dirs, max_workers, entries)
+            return
+        code_hits, config_hits = [], []
+        _scan_dir(_popleft(), exclude_dirs, _append, code_hits.append, config_hits.append, entries)
+        if code_hits or config_hits:
+            yield code_hits, config_hits
+
+
+def _git_ls_files(root: str, *args: str) -> list[str]:
+    proc = subprocess.run(["git", "-C", root, "ls-files", "-z", *args], capture_output=True, check=True)
+    return [os.fsdecode(record) for record in proc.stdout.split(b"\0") if record]
+
+
+def _list_git_files(root: str) -> Optional[list[str]]:
+    # Tracked plus untracked-but-not-ignored files, read from the index instead of walking the tree. To match the
+    # walk, tracked files deleted from the working tree and symlinks (mode 120000) or submodules (160000) are
+    # dropped. Gitignored files, such as a local .env, are left out on purpose; the walk has no ignore rules.
+    try:
+        staged = _git_ls_files(root, "--stage")
+        others = _git_ls_files(root, "--others", "--exclude-standard")
+        deleted = set(_git_ls_files(root, "--deleted"))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    tracked = {}
+    for record in staged:
+        meta, _, rel_path = record.partition("\t")
+        # Unmerged paths have one index entry per stage; the dict keeps each path once.
+        if not meta.startswith(("120000", "160000")) and rel_path not in deleted:
+            tracked[rel_path] = None
+    return [*tracked, *others]
+
+
+def _classify_git_files(root: str, rel_paths: list[str], exclude_dirs: frozenset[str]) -> tuple[list[str], list[str]]:
+    code_files = []
+    config_files = []
+    _code_append = code_files.append
+    _config_append = config_files.append
+    _join = os.path.join
+    excluded_parents = {}
+
+    for rel_path in rel_paths:
+        parent, _, name = rel_path.rpartition("/")
+        if parent:
+            excluded = excluded_parents.get(parent)
+            if excluded is None:
+                excluded = excluded_parents[parent] = not exclude_dirs.isdisjoint(parent.split("/"))
+            if excluded:
+                continue
+        dot = name.rfind(".")
+        ext = name[dot:] if dot > 0 else ""
+        if ext in _CODE_EXTS:
+            _code_append(_join(root, rel_path))
+        elif name in _CONFIG_FILES:
+            _config_append(_join(root, rel_path))
+
+    return code_files, config_files
+
+
+def _iter_batches(
+    root: str,
+    exclude_dirs: frozenset[str],
+    max_workers: int,
+    entries: bool = False,
+    dir_cache: Optional[dict] = None,
+    use_git: bool = False,
+) -> Iterator[tuple[list[str], list[str]]]:
+    # Yields (code_files, config_files) batches: one per directory for the walk, a single one for git listings.
+    # With entries=True walk batches carry DirEntry objects; git listings are always str paths. The listing is
+    # opt-in: it spawns git three times, is slower than the walk on a warm cache and drops gitignored files.
+    if use_git and os.path.isdir(os.path.join(root, ".git")):
+        git_files = _list_git_files(root)
+        if git_files is not None:
+            yield _classify_git_files(root, git_files, exclude_dirs)
+            return
+    yield from _iter_walk(root, exclude_dirs, max_workers, entries, dir_cache)
+
+
+def iter_repo_files(
+    repo_path: Union[str, Path],
+    max_workers: int = 1,
+    exclude_dirs: Optional[Iterable[str]] = None,
+    use_git: bool = False,
+) -> Iterator[tuple[str, str]]:
+    exclude_dirs = _SKIP_DIRS if exclude_dirs is None else frozenset(exclude_dirs)
+    root = str(Path(repo_path))
+    for code_hits, config_hits in _iter_batches(root, exclude_dirs, max_workers, use_git=use_git):
+        if root == ".":
+            code_hits, config_hits = _strip_dot_root(code_hits), _strip_dot_root(config_hits)
+        for path in code_hits:
+            yield "code", path
+        for path in config_hits:
+            yield "config", path
+
+
+def _strip_dot_root(paths: list[str]) -> list[str]:
+    # DirEntry.path and os.path.join keep the "./" that Path(".") / "a.py" drops, so a "." root would otherwise
+    # return "./a.py" where Path-based scans returned "a.py".
+    return [path[2:] for path in paths]
+
+
+def _cache_file(
+    cache_dir: Union[str, Path],
+    repo_path: str,
+    exclude_dirs: frozenset[str],
+    collect_sizes: bool = False,
+    use_git: bool = False,
+) -> Optional[Path]:
+    # HEAD only moves with commits, so this suits fetched clones rather than working copies with local edits.
+    sha = read_head_sha(repo_path)
+    if sha is None:
+        return None
+    key = f"{os.path.abspath(repo_path)}:{sha}:{sorted(exclude_dirs)}" + (":sizes" if collect_sizes else "")
+    key += ":git" if use_git else ""
+    key = hashlib.sha1(key.encode()).hexdigest()
+    return Path(cache_dir) / f"{key}.json"
+
+
+def _write_cache(cache_file: Path, result: dict) -> None:
+    tmp_path = None
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        logger.warning(f"Could not write scan cache {cache_file.as_posix()}")
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+
+
+def _scan(
+    root: str, exclude_dirs: frozenset[str], max_workers: int, dir_cache: Optional[dict] = None, use_git: bool = False
+) -> tuple[list[str], list[str]]:
+    code_files = []
+    config_files = []
+    for code_hits, config_hits in _iter_batches(root, exclude_dirs, max_workers, dir_cache=dir_cache, use_git=use_git):
+        code_files.extend(code_hits)
+        config_files.extend(config_hits)
+    return code_files, config_files
+
+
+def _scan_sizes(
+    root: str, exclude_dirs: frozenset[str], max_workers: int, use_git: bool = False
+) -> tuple[list[str], list[str], dict[str, int]]:
+    # Sizes come from the DirEntry already used to classify the file, which caches its stat, instead of a second
+    # os.stat by path. Git listings only have paths and take one stat each.
     code_files = []
     config_files = []
+    file_sizes = {}
+    for code_hits, config_hits in _iter_batches(root, exclude_dirs, max_workers, entries=True, use_git=use_git):
+        for hits, files in ((code_hits, code_files), (config_hits, config_files)):
+            for hit in hits:
+                path = hit if isinstance(hit, str) else hit.path
+                files.append(path)
+                try:
+                    st = os.stat(path, follow_symlinks=False) if hit is path else hit.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                file_sizes[path] = st.st_size
+    return code_files, config_files, file_sizes
 
-    for root, _, files in os.walk(repo_path):
-        for file in files:
-            file_path = Path(root) / file
-            if file_path.suffix in SUPPORTED_CODE_EXTS:
-                code_files.append(str(file_path))
-            elif file_path.name in SUPPORTED_CONFIG_FILES:
-                config_files.append(str(file_path))
 
-    logger.info(f"Scanned repo at {repo_path.as_posix()}")
-    logger.debug(f"Found {len(code_files)} code files and {len(config_files)} config files.")
+# The cache file name already encodes the HEAD sha, so repeated scans in one process skip the disk read too.
+@functools.lru_cache(maxsize=32)
+def _scan_cached(
+    root: str,
+    exclude_dirs: frozenset[str],
+    max_workers: int,
+    cache_file: Path,
+    collect_sizes: bool = False,
+    use_git: bool = False,
+) -> tuple[tuple[str, ...], tuple[str, ...], Optional[tuple[tuple[str, int], ...]]]:
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        file_sizes = tuple(cached["file_sizes"].items()) if collect_sizes else None
+        logger.opt(lazy=True).debug("Loaded cached scan from {}", cache_file.as_posix)
+        return tuple(cached["code_files"]), tuple(cached["config_files"]), file_sizes
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    if collect_sizes:
+        code_files, config_files, file_sizes = _scan_sizes(root, exclude_dirs, max_workers, use_git)
+        payload = {"code_files": code_files, "config_files": config_files, "file_sizes": file_sizes}
+        _write_cache(cache_file, payload)
+        return tuple(code_files), tuple(config_files), tuple(file_sizes.items())
+    code_files, config_files = _scan(root, exclude_dirs, max_workers, use_git=use_git)
+    _write_cache(cache_file, {"code_files": code_files, "config_files": config_files})
+    return tuple(code_files), tuple(config_files), None
+
+
+def scan_repo(
+    repo_path: Union[str, Path],
+    max_workers: int = 1,
+    cache_dir: Optional[Union[str, Path]] = None,
+    exclude_dirs: Optional[Iterable[str]] = None,
+    collect_sizes: bool = False,
+    dir_cache: Optional[dict] = None,
+    use_git: bool = False,
+) -> dict:
+    # Paths stay str end to end: DirEntry.path and os.path.join already produce them.
+    repo_path = Path(repo_path)
+    root = str(repo_path)
+    exclude_dirs = _SKIP_DIRS if exclude_dirs is None else frozenset(exclude_dirs)
+    cache_file = _cache_file(cache_dir, root, exclude_dirs, collect_sizes, use_git) if cache_dir is not None else None
+
+    file_sizes = None
+    if cache_file is not None:
+        code_hits, config_hits, size_items = _scan_cached(
+            root, exclude_dirs, max_workers, cache_file, collect_sizes, use_git
+        )
+        code_files, config_files = list(code_hits), list(config_hits)
+        file_sizes = dict(size_items) if collect_sizes else None
+    elif collect_sizes:
+        code_files, config_files, file_sizes = _scan_sizes(root, exclude_dirs, max_workers, use_git)
+    else:
+        # dir_cache is caller-owned and filled in place; sizes can change without touching a directory's mtime,
+        # so sized scans never use it. It only applies to walks, never to a git listing.
+        code_files, config_files = _scan(root, exclude_dirs, max_workers, dir_cache, use_git)
+    if root == ".":
+        code_files, config_files = _strip_dot_root(code_files), _strip_dot_root(config_files)
+        if file_sizes is not None:
+            file_sizes = {path[2:]: size for path, size in file_sizes.items()}
+    result = {"code_files": code_files, "config_files": config_files}
+    if collect_sizes:
+        result["file_sizes"] = file_sizes
+
+    logger.info("Scanned repo at {}", repo_path.as_posix())
+    logger.opt(lazy=True).debug(
+        "Found {} code files and {} config files.",
+        lambda: len(result["code_files"]),
+        lambda: len(result["config_files"]),
+    )
+
+    return result
+
+
+def _ignore(entry: os.DirEntry) -> None:
+    pass
+
+
+def scan_repo_with(
+    repo_path: Union[str, Path],
+    on_code: Optional[Callable[[os.DirEntry], None]] = None,
+    on_config: Optional[Callable[[os.DirEntry], None]] = None,
+    exclude_dirs: Optional[Iterable[str]] = None,
+) -> None:
+    # Always walks the filesystem: callbacks get the DirEntry, so entry.stat() reuses the dirent just read
+    # instead of re-resolving the path later.
+    repo_path = Path(repo_path)
+    exclude_dirs = _SKIP_DIRS if exclude_dirs is None else frozenset(exclude_dirs)
+    on_code = on_code or _ignore
+    on_config = on_config or _ignore
+
+    queue = deque([str(repo_path)])
+    _popleft = queue.popleft
+    _append = queue.append
+    while queue:
+        _scan_dir(_popleft(), exclude_dirs, _append, on_code, on_config, entries=True)
 
-    return {"code_files": code_files, "config_files": config_files}
+    logger.info("Scanned repo at {}", repo_path.as_posix())
@@ -2,13 +2,25 @@
 
 """Shared pytest configuration and fixtures for ingest module tests."""
 
+import os
 import tempfile
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import patch
 
 import pytest
 
 
+@pytest.fixture(scope="session", autouse=True)
+def tmpfs_tempdir():
+    """Put every TemporaryDirectory/mkdtemp on tmpfs when /dev/shm is usable, keeping fixture I/O off the disk."""
+    shm = "/dev/shm"
+    if not (os.path.isdir(shm) and os.access(shm, os.W_OK | os.X_OK)):
+        yield
+        return
+    with patch.object(tempfile, "tempdir", shm):
+        yield
+
+
 @pytest.fixture
 def temp_directory():
     """Fixture providing a temporary directory for tests."""
@@ -49,17 +61,9 @@ def sample_repo_structure(temp_directory):
     return repo_path
 
 
-@pytest.fixture
-def mock_git_repo():
-    """Fixture providing a mock git repository."""
-    mock_repo = MagicMock()
-    mock_repo.clone_from.return_value = mock_repo
-    return mock_repo
-
-
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def configure_loguru():
-    """Configure loguru for testing to avoid log pollution."""
+    """Configure loguru once per session to avoid log pollution; logger.add is too slow to repeat per test."""
     from loguru import logger
 
     # Remove default logger
@@ -72,3 +76,14 @@ def configure_loguru():
 
     # Clean up after test
     logger.remove()
+
+
+@pytest.fixture(autouse=True)
+def without_optional_backends():
+    """Use the git subprocess and requests paths so tests behave the same whether pygit2/aiohttp/httpx are installed."""
+    with (
+        patch("gitsage.repo_ingest.repo_fetcher.pygit2", None),
+        patch("gitsage.repo_ingest.repo_fetcher.aiohttp", None),
+        patch("gitsage.repo_ingest.repo_fetcher.httpx", None),
+    ):
+        yield
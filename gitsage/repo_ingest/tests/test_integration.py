@@ -2,6 +2,7 @@
 
 """Integration tests for the repo_ingest module."""
 
+import os
 import tempfile
 from pathlib import Path
 from unittest.mock import patch
@@ -150,17 +151,17 @@ __pycache__/
 
             yield repo_path
 
-    @patch("gitsage.repo_ingest.repo_fetcher.Repo")
-    def test_clone_and_scan_workflow(self, mock_repo, mock_git_repo_with_files):
+    @patch("gitsage.repo_ingest.repo_fetcher.subprocess.run")
+    def test_clone_and_scan_workflow(self, mock_run, mock_git_repo_with_files):
         """Test the complete workflow of cloning and scanning a repository."""
         with tempfile.TemporaryDirectory() as temp_clone_dir:
             # Mock the clone operation to copy our test repo
-            def mock_clone_from(url, path):
+            def mock_git_clone(cmd, **kwargs):
                 import shutil
 
-                shutil.copytree(mock_git_repo_with_files, path)
+                shutil.copytree(mock_git_repo_with_files, cmd[-1])
 
-            mock_repo.clone_from.side_effect = mock_clone_from
+            mock_run.side_effect = mock_git_clone
 
             # Step 1: Clone the repository
             repo_url = "https://github.com/test/test-repo.git"
@@ -182,21 +183,21 @@ __pycache__/
             config_files = scan_result["config_files"]
 
             # Check code files
-            code_file_names = [Path(f).name for f in code_files]
+            code_file_names = [os.path.basename(f) for f in code_files]
             expected_code_files = {"main.py", "utils.py", "app.js", "models.py", "test_utils.py"}
             assert len(code_files) == len(expected_code_files)
             for expected_file in expected_code_files:
                 assert expected_file in code_file_names
 
             # Check config files
-            config_file_names = [Path(f).name for f in config_files]
+            config_file_names = [os.path.basename(f) for f in config_files]
             expected_config_files = {"README.md", "requirements.txt", "package.json", ".gitignore"}
             assert len(config_files) == len(expected_config_files)
             for expected_file in expected_config_files:
                 assert expected_file in config_file_names
 
-    @patch("gitsage.repo_ingest.repo_fetcher.Repo")
-    def test_clone_existing_then_scan(self, mock_repo_class, mock_git_repo_with_files):
+    @patch("gitsage.repo_ingest.repo_fetcher.subprocess.run")
+    def test_clone_existing_then_scan(self, mock_run, mock_git_repo_with_files):
         """Test scanning a repository that already exists locally."""
         with tempfile.TemporaryDirectory() as temp_clone_dir:
             # Pre-create the repository directory
@@ -212,7 +213,7 @@ __pycache__/
 
             # Should return existing path without cloning
             assert cloned_path == str(target_path)
-            mock_repo_class.clone_from.assert_not_called()
+            mock_run.assert_not_called()
 
             # Scan should still work
             scan_result = scan_repo(cloned_path)
@@ -230,8 +231,8 @@ __pycache__/
             assert scan_result["code_files"] == []
             assert scan_result["config_files"] == []
 
-    @patch("gitsage.repo_ingest.repo_fetcher.Repo")
-    def test_real_world_repo_structure(self, mock_repo_class):
+    @patch("gitsage.repo_ingest.repo_fetcher.subprocess.run")
+    def test_real_world_repo_structure(self, mock_run):
         """Test with a more complex, real-world-like repository structure."""
         with tempfile.TemporaryDirectory() as temp_dir:
             # Create a complex repo structure
@@ -276,12 +277,12 @@ __pycache__/
                 (repo_path / filename).write_text(content)
 
             # Mock clone operation
-            def mock_clone_from(url, path):
+            def mock_git_clone(cmd, **kwargs):
                 import shutil
 
-                shutil.copytree(repo_path, path)
+                shutil.copytree(repo_path, cmd[-1])
 
-            mock_repo_class.clone_from.side_effect = mock_clone_from
+            mock_run.side_effect = mock_git_clone
 
             # Test the workflow
             with tempfile.TemporaryDirectory() as clone_dir:
@@ -308,8 +309,8 @@ __pycache__/
 
         # Test cloning to a file (not directory) - should handle gracefully
         with tempfile.NamedTemporaryFile() as temp_file:
-            with patch("gitsage.repo_ingest.repo_fetcher.Repo") as mock_repo:
-                mock_repo.clone_from.side_effect = Exception("Cannot clone to file")
+            with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
+                mock_run.side_effect = Exception("Cannot clone to file")
 
                 with pytest.raises(Exception):
                     fetcher = RepoFetcher("https://github.com/test/repo.git", mode="clone", target_dir=temp_file.name)
@@ -320,14 +321,14 @@ __pycache__/
     def test_logging_integration(self, scanner_logger, cloner_logger, mock_git_repo_with_files):
         """Test that logging works correctly across both modules."""
         with tempfile.TemporaryDirectory() as temp_clone_dir:
-            with patch("gitsage.repo_ingest.repo_fetcher.Repo") as mock_repo:
+            with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
 
-                def mock_clone_from(url, path):
+                def mock_git_clone(cmd, **kwargs):
                     import shutil
 
-                    shutil.copytree(mock_git_repo_with_files, path)
+                    shutil.copytree(mock_git_repo_with_files, cmd[-1])
 
-                mock_repo.clone_from.side_effect = mock_clone_from
+                mock_run.side_effect = mock_git_clone
 
                 # Execute the workflow
                 fetcher = RepoFetcher("https://github.com/test/repo.git", mode="clone", target_dir=temp_clone_dir)
@@ -338,19 +339,19 @@ __pycache__/
                 cloner_logger.info.assert_called()
                 cloner_logger.success.assert_called()
                 scanner_logger.info.assert_called()
-                scanner_logger.debug.assert_called()
+                scanner_logger.opt.return_value.debug.assert_called()
 
-    @patch("gitsage.repo_ingest.repo_fetcher.Repo")
-    def test_multiple_repos_workflow(self, mock_repo_class, mock_git_repo_with_files):
+    @patch("gitsage.repo_ingest.repo_fetcher.subprocess.run")
+    def test_multiple_repos_workflow(self, mock_run, mock_git_repo_with_files):
         """Test cloning and scanning multiple repositories."""
         with tempfile.TemporaryDirectory() as temp_clone_dir:
 
-            def mock_clone_from(url, path):
+            def mock_git_clone(cmd, **kwargs):
                 import shutil
 
-                shutil.copytree(mock_git_repo_with_files, path)
+                shutil.copytree(mock_git_repo_with_files, cmd[-1])
 
-            mock_repo_class.clone_from.side_effect = mock_clone_from
+            mock_run.side_effect = mock_git_clone
 
             repos = [
                 "https://github.com/test/repo1.git",
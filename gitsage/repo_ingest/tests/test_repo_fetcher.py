@@ -2,14 +2,33 @@
 
 """Unit tests for the repo_fetcher module."""
 
+import asyncio
+import hashlib
+import http.server
+import io
+import json
 import os
+import shutil
+import subprocess
+import tarfile
 import tempfile
-from unittest.mock import MagicMock, Mock, patch
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, mock_open, patch
 
 import pytest
 import requests
 
-from ..repo_fetcher import RepoFetcher
+from ..repo_fetcher import CloneError, RepoFetcher, clone_repos, fetch_many
+
+
+def blob_response(status_code=200, body=b""):
+    """Build a streamed raw-host response that works as a context manager."""
+    resp = MagicMock(status_code=status_code)
+    resp.raw = io.BytesIO(body)
+    resp.__enter__.return_value = resp
+    return resp
 
 
 class TestRepoFetcher:
@@ -27,6 +46,7 @@ class TestRepoFetcher:
 
         assert fetcher.target_dir == Path("./repos")
         assert fetcher.token is None
+        assert fetcher.depth == 1
 
     def test_init_custom_values(self):
         """Test RepoFetcher initialization with custom values."""
@@ -71,9 +91,44 @@ class TestRepoFetcher:
         repo_url = "https://github.com/user/test-repo.git"
         fetcher = RepoFetcher(repo_url, mode="invalid")
 
-        with pytest.raises(ValueError, match="Unsupported mode. Use 'clone' or 'api'."):
+        with pytest.raises(ValueError, match="Unsupported mode. Use 'clone', 'api' or 'api_files'."):
             fetcher.fetch()
 
+    def test_extract_repo_name_keeps_inner_git(self):
+        """Test that only a trailing .git suffix is removed from the name."""
+        fetcher = RepoFetcher("https://github.com/user/user.github.io.git")
+
+        assert fetcher._extract_repo_name() == "user.github.io"
+
+    def test_owner_and_repo_parsed_once(self):
+        """Test that owner and repo are parsed in __init__ for https and ssh URLs alike."""
+        for repo_url in ("https://github.com/user/repo.git/", "git@github.com:user/repo.git"):
+            fetcher = RepoFetcher(repo_url)
+            assert (fetcher._owner, fetcher._repo) == ("user", "repo")
+
+    def test_session_without_token_has_no_auth_header(self):
+        """Test that anonymous fetchers do not send an Authorization header."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", mode="api")
+
+        assert "Authorization" not in fetcher._session.headers
+
+    def test_session_retries_and_pools_github_hosts(self):
+        """Test that GitHub hosts share one pooled adapter that retries transient failures."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", mode="api")
+
+        adapters = {
+            fetcher._session.get_adapter(url)
+            for url in (
+                "https://api.github.com/repos/user/test-repo",
+                "https://codeload.github.com/user/test-repo/legacy.tar.gz/HEAD",
+                "https://raw.githubusercontent.com/user/test-repo/HEAD/README.md",
+            )
+        }
+        assert len(adapters) == 1
+        retries = adapters.pop().max_retries
+        assert retries.total == 3
+        assert 429 in retries.status_forcelist and 503 in retries.status_forcelist
+
     def test_extract_repo_name_with_git_extension(self):
         """Test extracting repository name from URL with .git extension."""
         repo_url = "https://github.com/user/test-repo.git"
@@ -113,6 +168,133 @@ class TestRepoFetcher:
             assert result == expected_name
 
 
+class TestRepoFetcherSessionRetries:
+    """Test blob downloads through the real retrying adapter against a local HTTP server."""
+
+    @pytest.fixture
+    def server(self):
+        """Serve a good blob, a redirected blob and a blob that always answers 503."""
+        hits = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(self.path)
+                if self.path == "/good.py":
+                    self._reply(200, b"good")
+                elif self.path == "/moved.py":
+                    self.send_response(301)
+                    self.send_header("Location", "/new/moved.py")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                elif self.path == "/new/moved.py":
+                    self._reply(200, b"moved")
+                else:
+                    self._reply(503, b"busy")
+
+            def _reply(self, status, body):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{httpd.server_address[1]}", hits
+        httpd.shutdown()
+        httpd.server_close()
+
+    def test_exhausted_retries_skip_the_blob(self, server, temp_directory):
+        """Test that a blob failing every retry is skipped instead of aborting the whole download."""
+        base_url, hits = server
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", max_concurrency=1)
+        fetcher._session.mount(base_url, fetcher._session.get_adapter("https://raw.githubusercontent.com"))
+        blob_shas = {"good.py": None, "moved.py": None, "busy.py": None}
+
+        with (
+            patch.object(RepoFetcher, "_list_blobs", return_value=("HEAD", blob_shas)),
+            patch(
+                "gitsage.repo_ingest.repo_fetcher._raw_url",
+                side_effect=lambda owner, repo, ref, blob_path: f"{base_url}/{blob_path}",
+            ),
+            patch("urllib3.util.retry.time.sleep"),
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            fetcher._download_via_api_files()
+
+        assert hits.count("/busy.py") == 4
+        assert (temp_directory / "good.py").read_bytes() == b"good"
+        assert (temp_directory / "moved.py").read_bytes() == b"moved"
+        assert not (temp_directory / "busy.py").exists()
+
+
+class TestRepoFetcherTokenPool:
+    """Test cases for spreading API requests over several tokens."""
+
+    def _response(self, remaining, reset=0):
+        return Mock(headers={"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(reset)})
+
+    def test_token_alias_fills_pool(self):
+        """Test that the single token argument still works as a one-token pool."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", token="only")
+
+        assert fetcher.tokens == ["only"]
+        assert fetcher.token == "only"
+
+    def test_requests_use_token_with_most_budget(self):
+        """Test that each request goes out with the token that has the most remaining calls."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", tokens=["a", "b"])
+
+        with patch("requests.Session.get", side_effect=[self._response(10), self._response(4999)]) as mock_get:
+            fetcher._request("get", "https://api.github.com/first")
+            fetcher._request("get", "https://api.github.com/second")
+
+        used = [call.kwargs["headers"]["Authorization"] for call in mock_get.call_args_list]
+        assert used == ["token a", "token b"]
+        assert fetcher._token_state["a"]["remaining"] == 10
+        assert fetcher._token_state["b"]["remaining"] == 4999
+
+    def test_graphql_budget_not_recorded_as_rest_budget(self):
+        """Test that GraphQL rate-limit headers leave the REST budget of the token untouched."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", tokens=["a", "b"])
+        graphql = Mock(headers={"X-RateLimit-Resource": "graphql", "X-RateLimit-Remaining": "4990"})
+        core = Mock(headers={"X-RateLimit-Resource": "core", "X-RateLimit-Remaining": "3"})
+
+        with patch("requests.Session.post", return_value=graphql), patch("requests.Session.get", return_value=core):
+            fetcher._request("get", "https://api.github.com/rest")
+            fetcher._request("post", "https://api.github.com/graphql")
+
+        assert fetcher._token_state["a"]["remaining"] == 3
+        assert fetcher._token_state["b"]["remaining"] == 5000
+
+    def test_sleeps_until_earliest_reset_when_exhausted(self):
+        """Test that an exhausted pool waits for the first token to reset."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", tokens=["a", "b"])
+        fetcher._token_state = {"a": {"remaining": 0, "reset": 1030.0}, "b": {"remaining": 0, "reset": 1010.0}}
+
+        with (
+            patch("gitsage.repo_ingest.repo_fetcher.time.time", return_value=1000.0),
+            patch("gitsage.repo_ingest.repo_fetcher.time.sleep") as mock_sleep,
+        ):
+            token = fetcher._pick_token()
+
+        assert token == "b"
+        mock_sleep.assert_called_once_with(10.0)
+
+    def test_single_token_uses_session_header(self):
+        """Test that a lone token is sent via the session without per-request headers."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", token="only")
+
+        with patch("requests.Session.get") as mock_get:
+            fetcher._request("get", "https://api.github.com/x")
+
+        mock_get.assert_called_once_with("https://api.github.com/x")
+        assert fetcher._session.headers["Authorization"] == "token only"
+
+
 class TestRepoFetcherClone:
     """Test cases for the _clone_repo method."""
 
@@ -123,25 +305,71 @@ class TestRepoFetcherClone:
             yield temp_dir
 
     @pytest.fixture
-    def mock_repo(self):
-        """Mock Git repository for testing."""
-        with patch("gitsage.repo_ingest.repo_fetcher.Repo") as mock_repo:
-            yield mock_repo
+    def mock_run(self):
+        """Mock the git subprocess for testing."""
+        with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
+            yield mock_run
 
-    def test_clone_repo_success(self, temp_dir, mock_repo):
+    def test_clone_repo_success(self, temp_dir, mock_run):
         """Test successful repository cloning."""
         repo_url = "https://github.com/user/test-repo.git"
         fetcher = RepoFetcher(repo_url, target_dir=temp_dir)
 
-        mock_repo.clone_from.return_value = MagicMock()
-
         result = fetcher._clone_repo()
 
         expected_path = os.path.join(temp_dir, "test-repo")
         assert result == expected_path
-        mock_repo.clone_from.assert_called_once_with(repo_url, expected_path)
+        mock_run.assert_called_once_with(
+            [
+                "git",
+                "-c",
+                "protocol.version=2",
+                "clone",
+                "--depth",
+                "1",
+                "--single-branch",
+                "--no-tags",
+                "--",
+                repo_url,
+                expected_path,
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+
+    def test_clone_repo_full_history(self, temp_dir, mock_run):
+        """Test that depth=None clones the full history."""
+        repo_url = "https://github.com/user/test-repo.git"
+        fetcher = RepoFetcher(repo_url, target_dir=temp_dir, depth=None)
+
+        result = fetcher._clone_repo()
+
+        assert mock_run.call_args.args[0] == ["git", "-c", "protocol.version=2", "clone", "--", repo_url, result]
+
+    def test_clone_repo_blobless(self, temp_dir, mock_run):
+        """Test that blobless=True requests a partial clone on top of the shallow one."""
+        repo_url = "https://github.com/user/test-repo.git"
+        fetcher = RepoFetcher(repo_url, target_dir=temp_dir, blobless=True)
+
+        result = fetcher._clone_repo()
+
+        assert mock_run.call_args.args[0] == [
+            "git",
+            "-c",
+            "protocol.version=2",
+            "clone",
+            "--depth",
+            "1",
+            "--single-branch",
+            "--no-tags",
+            "--filter=blob:none",
+            "--",
+            repo_url,
+            result,
+        ]
 
-    def test_clone_repo_already_exists(self, temp_dir, mock_repo):
+    def test_clone_repo_already_exists(self, temp_dir, mock_run):
         """Test behavior when repository already exists."""
         repo_url = "https://github.com/user/test-repo.git"
         fetcher = RepoFetcher(repo_url, target_dir=temp_dir)
@@ -153,18 +381,91 @@ class TestRepoFetcherClone:
         result = fetcher._clone_repo()
 
         assert result == repo_path
-        # Should not call clone_from when repo already exists
-        mock_repo.clone_from.assert_not_called()
+        # Should not run git clone when repo already exists
+        mock_run.assert_not_called()
+
+    def _fake_clone(self, temp_dir, sha):
+        git_dir = os.path.join(temp_dir, "test-repo", ".git")
+        os.makedirs(os.path.join(git_dir, "refs", "heads"))
+        with open(os.path.join(git_dir, "HEAD"), "w") as f:
+            f.write("ref: refs/heads/main\n")
+        with open(os.path.join(git_dir, "refs", "heads", "main"), "w") as f:
+            f.write(sha + "\n")
+
+    def test_update_skips_fetch_when_up_to_date(self, temp_dir, mock_run):
+        """Test that an existing clone at the remote HEAD costs only an ls-remote."""
+        self._fake_clone(temp_dir, "a" * 40)
+        mock_run.return_value = Mock(stdout=f"{'a' * 40}\tHEAD\n")
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir, update=True)
+
+        fetcher._clone_repo()
+
+        mock_run.assert_called_once()
+        assert mock_run.call_args.args[0][:2] == ["git", "ls-remote"]
+
+    def test_update_fetches_when_behind(self, temp_dir, mock_run):
+        """Test that a stale clone is refreshed with a shallow fetch instead of a new clone."""
+        self._fake_clone(temp_dir, "a" * 40)
+        mock_run.return_value = Mock(stdout=f"{'b' * 40}\tHEAD\n")
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir, update=True)
+
+        result = fetcher._clone_repo()
+
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        assert commands[1] == [
+            "git",
+            "-C",
+            result,
+            "-c",
+            "protocol.version=2",
+            "fetch",
+            "--no-tags",
+            "--depth",
+            "1",
+            "origin",
+            "HEAD",
+        ]
+        assert commands[2] == ["git", "-C", result, "reset", "--keep", "FETCH_HEAD"]
+        assert not any("clone" in command for command in commands)
+
+    def test_update_ignores_directories_that_are_not_clones(self, temp_dir, mock_run):
+        """Test that an existing directory without .git/HEAD is returned untouched."""
+        os.makedirs(os.path.join(temp_dir, "test-repo"))
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir, update=True)
+
+        fetcher._clone_repo()
+
+        mock_run.assert_not_called()
+
+    @patch("gitsage.repo_ingest.repo_fetcher.logger")
+    def test_existing_directory_without_head_logs_warning(self, mock_logger, temp_dir, mock_run):
+        """Test that a leftover directory with no .git/HEAD is reported as a possible half-finished clone."""
+        os.makedirs(os.path.join(temp_dir, "test-repo", ".git"))
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir)
+
+        fetcher._clone_repo()
+
+        mock_logger.warning.assert_called_once()
+        assert "half-finished clone" in mock_logger.warning.call_args.args[0]
+        mock_run.assert_not_called()
+
+    @patch("gitsage.repo_ingest.repo_fetcher.logger")
+    def test_existing_clone_logs_no_warning(self, mock_logger, temp_dir, mock_run):
+        """Test that a complete clone is reused without a warning."""
+        self._fake_clone(temp_dir, "a" * 40)
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir)
+
+        fetcher._clone_repo()
 
-    def test_clone_repo_creates_target_directory(self, mock_repo):
+        mock_logger.warning.assert_not_called()
+
+    def test_clone_repo_creates_target_directory(self, mock_run):
         """Test that target directory is created if it doesn't exist."""
         with tempfile.TemporaryDirectory() as temp_base:
             target_dir = os.path.join(temp_base, "new_target_dir")
             repo_url = "https://github.com/user/test-repo.git"
             fetcher = RepoFetcher(repo_url, target_dir=target_dir)
 
-            mock_repo.clone_from.return_value = MagicMock()
-
             result = fetcher._clone_repo()
 
             # Verify directory was created
@@ -173,13 +474,11 @@ class TestRepoFetcherClone:
             assert result == expected_path
 
     @patch("gitsage.repo_ingest.repo_fetcher.logger")
-    def test_clone_repo_logging_success(self, mock_logger, temp_dir, mock_repo):
+    def test_clone_repo_logging_success(self, mock_logger, temp_dir, mock_run):
         """Test that appropriate logging messages are generated for successful clone."""
         repo_url = "https://github.com/user/test-repo.git"
         fetcher = RepoFetcher(repo_url, target_dir=temp_dir)
 
-        mock_repo.clone_from.return_value = MagicMock()
-
         fetcher._clone_repo()
 
         # Verify logging calls
@@ -187,7 +486,7 @@ class TestRepoFetcherClone:
         mock_logger.success.assert_called_once()
 
     @patch("gitsage.repo_ingest.repo_fetcher.logger")
-    def test_clone_repo_logging_existing(self, mock_logger, temp_dir, mock_repo):
+    def test_clone_repo_logging_existing(self, mock_logger, temp_dir, mock_run):
         """Test logging when repository already exists."""
         repo_url = "https://github.com/user/test-repo.git"
         fetcher = RepoFetcher(repo_url, target_dir=temp_dir)
@@ -206,25 +505,353 @@ class TestRepoFetcherClone:
         # Should not call success logger
         mock_logger.success.assert_not_called()
 
-    def test_clone_repo_git_exception(self, temp_dir, mock_repo):
+    def test_clone_repo_git_exception(self, temp_dir, mock_run):
         """Test handling of Git exceptions during cloning."""
         repo_url = "https://github.com/user/nonexistent-repo.git"
         fetcher = RepoFetcher(repo_url, target_dir=temp_dir)
 
-        # Mock Git exception
-        mock_repo.clone_from.side_effect = Exception("Git clone failed")
+        # Mock a failing git clone
+        mock_run.side_effect = subprocess.CalledProcessError(
+            128, ["git", "clone"], stderr="fatal: repository not found\n"
+        )
 
-        with pytest.raises(Exception, match="Git clone failed"):
+        with pytest.raises(CloneError, match="repository not found"):
             fetcher._clone_repo()
 
+    def test_clone_repo_git_not_installed(self, temp_dir, mock_run):
+        """Test that a missing git executable is reported as a CloneError."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir)
+        mock_run.side_effect = FileNotFoundError("git")
+
+        with pytest.raises(CloneError, match="git executable not found"):
+            fetcher._clone_repo()
+
+
+class TestRepoFetcherPygit2Clone:
+    """Test cases for cloning in-process through pygit2 when it is installed."""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Create a temporary directory for testing."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield temp_dir
+
+    @pytest.fixture
+    def mock_pygit2(self):
+        """Install a stand-in pygit2 module."""
+        mock_pygit2 = Mock()
+        mock_pygit2.GitError = type("GitError", (Exception,), {})
+        with patch("gitsage.repo_ingest.repo_fetcher.pygit2", mock_pygit2):
+            yield mock_pygit2
+
+    def test_clone_uses_pygit2_instead_of_subprocess(self, temp_dir, mock_pygit2):
+        """Test that pygit2 performs the clone without spawning git."""
+        repo_url = "https://github.com/user/test-repo.git"
+        fetcher = RepoFetcher(repo_url, target_dir=temp_dir)
+
+        with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
+            result = fetcher._clone_repo()
+
+        mock_run.assert_not_called()
+        assert result == os.path.join(temp_dir, "test-repo")
+        mock_pygit2.clone_repository.assert_called_once_with(repo_url, result, depth=1)
+
+    def test_clone_full_history_passes_zero_depth(self, temp_dir, mock_pygit2):
+        """Test that depth=None maps to libgit2's unlimited depth."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir, depth=None)
+
+        fetcher._clone_repo()
+
+        assert mock_pygit2.clone_repository.call_args.kwargs["depth"] == 0
+
+    def test_blobless_clone_uses_git_cli(self, temp_dir, mock_pygit2):
+        """Test that partial clones bypass libgit2, which cannot filter blobs."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir, blobless=True)
+
+        with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
+            fetcher._clone_repo()
+
+        mock_pygit2.clone_repository.assert_not_called()
+        assert "--filter=blob:none" in mock_run.call_args.args[0]
+
+    def test_ssh_url_uses_git_cli(self, temp_dir, mock_pygit2):
+        """Test that scp-style SSH URLs go through git, which can use the ssh agent and git config."""
+        repo_url = "git@github.com:user/test-repo.git"
+        fetcher = RepoFetcher(repo_url, target_dir=temp_dir)
+
+        with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
+            result = fetcher._clone_repo()
+
+        mock_pygit2.clone_repository.assert_not_called()
+        assert mock_run.call_args.args[0][-2:] == [repo_url, result]
+
+    def test_clone_git_error_retries_with_git_cli(self, temp_dir, mock_pygit2):
+        """Test that a libgit2 failure removes the partial clone and retries with git."""
+        repo_path = Path(temp_dir) / "test-repo"
+
+        def fail_halfway(url, path, depth):
+            (repo_path / ".git").mkdir(parents=True)
+            raise mock_pygit2.GitError("remote authentication required")
+
+        mock_pygit2.clone_repository.side_effect = fail_halfway
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", target_dir=temp_dir)
+
+        with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
+            result = fetcher._clone_repo()
+
+        assert result == str(repo_path)
+        assert mock_run.call_args.args[0][-2:] == ["https://github.com/user/test-repo.git", result]
+        assert not repo_path.exists()
+
+    def test_clone_git_error_raises_clone_error_when_git_fails_too(self, temp_dir, mock_pygit2):
+        """Test that CloneError is raised once both libgit2 and git have failed."""
+        mock_pygit2.clone_repository.side_effect = mock_pygit2.GitError("unexpected http status code: 404")
+        fetcher = RepoFetcher("https://github.com/user/missing.git", target_dir=temp_dir)
+        git_error = subprocess.CalledProcessError(128, "git", stderr="fatal: repository not found (404)")
+
+        with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run", side_effect=git_error):
+            with pytest.raises(CloneError, match="404"):
+                fetcher._clone_repo()
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git executable not available")
+class TestRepoFetcherUpdateWithGit:
+    """Test refreshing a real clone from a local upstream repository."""
+
+    def _git(self, *args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], check=True, capture_output=True, text=True
+        )
+
+    def test_update_brings_clone_to_remote_head(self, temp_directory):
+        """Test that update=True fast-forwards an existing shallow clone to the upstream HEAD."""
+        upstream = temp_directory / "upstream"
+        self._git("init", "-q", str(upstream))
+        (upstream / "a.py").write_text("a = 1")
+        self._git("-C", str(upstream), "add", "a.py")
+        self._git("-C", str(upstream), "commit", "-q", "-m", "first")
+        url = upstream.as_uri()
+
+        target = temp_directory / "repos"
+        clone_path = RepoFetcher(url, target_dir=str(target)).fetch()
+        (upstream / "b.py").write_text("b = 2")
+        self._git("-C", str(upstream), "add", "b.py")
+        self._git("-C", str(upstream), "commit", "-q", "-m", "second")
+
+        RepoFetcher(url, target_dir=str(target), update=True).fetch()
+
+        assert (Path(clone_path) / "b.py").read_text() == "b = 2"
+
+
+class TestCloneRepos:
+    """Test cases for the clone_repos helper."""
+
+    @pytest.fixture
+    def mock_run(self):
+        """Mock the git subprocess for testing."""
+        with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run") as mock_run:
+            yield mock_run
+
+    def test_clone_repos_returns_paths_by_url(self, temp_directory, mock_run):
+        """Test that every URL is cloned and mapped to its local path."""
+        repo_urls = [
+            "https://github.com/user/repo1.git",
+            "https://github.com/user/repo2.git",
+            "https://github.com/user/repo3.git",
+        ]
+
+        result = clone_repos(repo_urls, target_dir=str(temp_directory), max_workers=3)
+
+        assert result == {url: os.path.join(str(temp_directory), f"repo{i}") for i, url in enumerate(repo_urls, 1)}
+        assert mock_run.call_count == 3
+
+    def test_clone_repos_deduplicates_urls(self, temp_directory, mock_run):
+        """Test that repeated URLs are only cloned once."""
+        repo_url = "https://github.com/user/repo.git"
+
+        result = clone_repos([repo_url, repo_url], target_dir=str(temp_directory))
+
+        assert list(result) == [repo_url]
+        mock_run.assert_called_once()
+
+    def test_clone_repos_same_name_runs_sequentially(self, temp_directory, mock_run):
+        """Test that URLs sharing a repo name do not clone into the same path concurrently."""
+        mock_run.side_effect = lambda cmd, **kwargs: os.makedirs(cmd[-1])
+        repo_urls = ["https://github.com/alice/repo.git", "https://github.com/bob/repo.git"]
+
+        result = clone_repos(repo_urls, target_dir=str(temp_directory), max_workers=2)
+
+        assert set(result.values()) == {os.path.join(str(temp_directory), "repo")}
+        mock_run.assert_called_once()
+
+    def test_clone_repos_forwards_fetcher_options(self, temp_directory, mock_run):
+        """Test that extra keyword arguments reach RepoFetcher."""
+        clone_repos(["https://github.com/user/repo.git"], target_dir=str(temp_directory), depth=None)
+
+        assert mock_run.call_args.args[0] == [
+            "git",
+            "-c",
+            "protocol.version=2",
+            "clone",
+            "--",
+            "https://github.com/user/repo.git",
+            os.path.join(str(temp_directory), "repo"),
+        ]
+
+
+class TestRepoFetcherTarball:
+    """Test cases for the tarball-based _download_via_api method."""
+
+    @staticmethod
+    def _tarball(entries):
+        """Build a gzipped tarball shaped like GitHub's, with every entry under one top-level directory."""
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+            for name, content in entries:
+                info = tarfile.TarInfo(name)
+                if content is None:
+                    info.type = tarfile.SYMTYPE
+                    info.linkname = "/etc/passwd"
+                    tf.addfile(info)
+                else:
+                    info.size = len(content)
+                    tf.addfile(info, io.BytesIO(content))
+        buf.seek(0)
+        return buf
+
+    @pytest.fixture
+    def mock_get(self):
+        """Mock the tarball request."""
+        with patch("requests.Session.get") as mock_get:
+            yield mock_get
+
+    def _respond(self, mock_get, entries):
+        mock_resp = MagicMock()
+        mock_resp.raise_for_status.return_value = None
+        mock_resp.raw = self._tarball(entries)
+        mock_get.return_value = mock_resp
+        return mock_resp
+
+    def test_tarball_single_request(self, mock_get):
+        """Test that the whole repository arrives in one streamed request."""
+        self._respond(mock_get, [("user-test-repo-abc123/README.md", b"# Test")])
+        fetcher = RepoFetcher("https://github.com/user/test-repo.git", mode="api", token="test_token")
+
+        result = fetcher.fetch()
+
+        mock_get.assert_called_once_with("https://api.github.com/repos/user/test-repo/tarball/HEAD", stream=True)
+        assert fetcher._session.headers["Authorization"] == "token test_token"
+        shutil.rmtree(result)
+
+    def test_tarball_strips_top_level_directory(self, mock_get):
+        """Test that files land directly under the temp dir."""
+        self._respond(
+            mock_get,
+            [
+                ("user-test-repo-abc123/README.md", b"# Test"),
+                ("user-test-repo-abc123/src/main.py", b"print('hi')"),
+            ],
+        )
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api")
+
+        result = fetcher.fetch()
+
+        assert (Path(result) / "README.md").read_bytes() == b"# Test"
+        assert (Path(result) / "src" / "main.py").read_bytes() == b"print('hi')"
+        assert Path(result).name.startswith("test-repo-")
+        shutil.rmtree(result)
+
+    def test_tarball_skips_links_and_escaping_paths(self, mock_get):
+        """Test that symlinks and entries escaping the extraction root are not extracted."""
+        self._respond(
+            mock_get,
+            [
+                ("user-test-repo-abc123/main.py", b"print('ok')"),
+                ("user-test-repo-abc123/link", None),
+                ("user-test-repo-abc123/../../evil.py", b"print('evil')"),
+            ],
+        )
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api")
+
+        result = fetcher.fetch()
+
+        assert sorted(os.listdir(result)) == ["main.py"]
+        assert not (Path(result).parent.parent / "evil.py").exists()
+        shutil.rmtree(result)
+
+    def test_tarball_http_error(self, mock_get):
+        """Test that HTTP errors from the tarball endpoint propagate."""
+        mock_resp = MagicMock()
+        mock_resp.raise_for_status.side_effect = requests.HTTPError("404 Not Found")
+        mock_get.return_value = mock_resp
+        fetcher = RepoFetcher("https://github.com/user/missing", mode="api")
+
+        with pytest.raises(requests.HTTPError):
+            fetcher.fetch()
+
+
+class TestAsyncFetch:
+    """Test cases for afetch and fetch_many."""
+
+    def test_afetch_runs_fetch_in_worker_thread(self):
+        """Test that afetch returns fetch()'s result without blocking the event loop thread."""
+        fetcher = RepoFetcher("https://github.com/user/repo.git")
+        loop_thread = threading.get_ident()
+        seen = []
+
+        def fake_fetch():
+            seen.append(threading.get_ident())
+            return "/path/to/repo"
+
+        with patch.object(fetcher, "fetch", side_effect=fake_fetch):
+            assert asyncio.run(fetcher.afetch()) == "/path/to/repo"
+
+        assert seen and seen[0] != loop_thread
+
+    def test_fetch_many_preserves_order_and_bounds_concurrency(self):
+        """Test that results line up with the input URLs and at most max_concurrency run at once."""
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def fake_fetch(self):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return f"/repos/{self._extract_repo_name()}"
+
+        urls = [f"https://github.com/user/repo{i}.git" for i in range(6)]
+        with patch.object(RepoFetcher, "fetch", fake_fetch):
+            results = asyncio.run(fetch_many(urls, max_concurrency=2))
+
+        assert results == [f"/repos/repo{i}" for i in range(6)]
+        assert state["peak"] == 2
+
+    def test_fetch_many_serialises_same_named_repos(self):
+        """Test that URLs mapping to one local directory are never fetched concurrently."""
+        active = []
+
+        def fake_fetch(self):
+            active.append(self.repo_url)
+            assert len(active) == 1
+            time.sleep(0.01)
+            active.remove(self.repo_url)
+            return self.repo_url
+
+        urls = ["https://github.com/alice/repo.git", "https://github.com/bob/repo.git"]
+        with patch.object(RepoFetcher, "fetch", fake_fetch):
+            assert asyncio.run(fetch_many(urls, max_concurrency=2)) == urls
+
 
 class TestRepoFetcherAPI:
-    """Test cases for the _download_via_api method."""
+    """Test cases for the per-file _download_via_api_files method."""
 
     def test_download_via_api_success(self):
         """Test successful API download."""
         repo_url = "https://github.com/user/test-repo"
-        fetcher = RepoFetcher(repo_url, mode="api")
+        fetcher = RepoFetcher(repo_url, mode="api_files")
 
         # Mock GitHub API tree response
         mock_tree_response = {
@@ -236,10 +863,10 @@ class TestRepoFetcherAPI:
         }
 
         with (
-            patch("requests.get") as mock_get,
+            patch("requests.Session.get") as mock_get,
             patch("tempfile.mkdtemp", return_value="/tmp/test-repo-12345") as mock_mkdtemp,
             patch("pathlib.Path.mkdir") as mock_mkdir,
-            patch("pathlib.Path.write_bytes") as mock_write_bytes,
+            patch("gitsage.repo_ingest.repo_fetcher.open", mock_open(), create=True) as mock_file,
         ):
 
             # Setup mock responses
@@ -247,13 +874,13 @@ class TestRepoFetcherAPI:
             mock_tree_resp.raise_for_status.return_value = None
             mock_tree_resp.json.return_value = mock_tree_response
 
-            mock_file_resp = Mock()
-            mock_file_resp.status_code = 200
-            mock_file_resp.content = b"file content"
-
-            mock_get.side_effect = [mock_tree_resp, mock_file_resp, mock_file_resp]
+            mock_get.side_effect = [
+                mock_tree_resp,
+                blob_response(body=b"file content"),
+                blob_response(body=b"file content"),
+            ]
 
-            result = fetcher._download_via_api()
+            result = fetcher._download_via_api_files()
 
             # Normalize path for comparison (Windows vs Unix separators)
             from pathlib import Path
@@ -264,35 +891,36 @@ class TestRepoFetcherAPI:
             mock_mkdtemp.assert_called_once_with(prefix="test-repo-")
 
             mock_mkdir.assert_called()  # Verify directories are created
-            mock_write_bytes.assert_called()  # Verify files are written
+            mock_file().write.assert_called_with(b"file content")  # Verify files are streamed to disk
 
     def test_download_via_api_with_token(self):
         """Test API download with authentication token."""
         repo_url = "https://github.com/user/private-repo"
         token = "test_token"
-        fetcher = RepoFetcher(repo_url, mode="api", token=token)
+        fetcher = RepoFetcher(repo_url, mode="api_files", token=token)
 
         mock_tree_response = {"tree": []}
 
-        with patch("requests.get") as mock_get, patch("tempfile.mkdtemp", return_value="/tmp/private-repo-12345"):
+        with (
+            patch("requests.Session.get") as mock_get,
+            patch("tempfile.mkdtemp", return_value="/tmp/private-repo-12345"),
+        ):
 
             mock_resp = Mock()
             mock_resp.raise_for_status.return_value = None
             mock_resp.json.return_value = mock_tree_response
             mock_get.return_value = mock_resp
 
-            fetcher._download_via_api()
+            fetcher._download_via_api_files()
 
-            # Verify token is included in headers
-            expected_headers = {"Authorization": "token test_token"}
-            mock_get.assert_called_with(
-                "https://api.github.com/repos/user/private-repo/git/trees/HEAD?recursive=1", headers=expected_headers
-            )
+            # Verify token is sent with every request on the session
+            assert fetcher._session.headers["Authorization"] == "token test_token"
+            mock_get.assert_called_with("https://api.github.com/repos/user/private-repo/git/trees/HEAD?recursive=1")
 
     def test_download_via_api_file_skip_on_error(self):
         """Test that files are skipped when download fails."""
         repo_url = "https://github.com/user/test-repo"
-        fetcher = RepoFetcher(repo_url, mode="api")
+        fetcher = RepoFetcher(repo_url, mode="api_files")
 
         mock_tree_response = {
             "tree": [
@@ -302,10 +930,10 @@ class TestRepoFetcherAPI:
         }
 
         with (
-            patch("requests.get") as mock_get,
+            patch("requests.Session.get") as mock_get,
             patch("tempfile.mkdtemp", return_value="/tmp/test-repo-12345"),
             patch("pathlib.Path.mkdir"),
-            patch("pathlib.Path.write_bytes"),
+            patch("gitsage.repo_ingest.repo_fetcher.open", mock_open(), create=True),
             patch("gitsage.repo_ingest.repo_fetcher.logger") as mock_logger,
         ):
 
@@ -314,50 +942,138 @@ class TestRepoFetcherAPI:
             mock_tree_resp.raise_for_status.return_value = None
             mock_tree_resp.json.return_value = mock_tree_response
 
-            mock_good_file = Mock()
-            mock_good_file.status_code = 200
-            mock_good_file.content = b"good content"
-
-            mock_bad_file = Mock()
-            mock_bad_file.status_code = 404
+            mock_get.side_effect = [mock_tree_resp, blob_response(body=b"good content"), blob_response(404)]
 
-            mock_get.side_effect = [mock_tree_resp, mock_good_file, mock_bad_file]
-
-            fetcher._download_via_api()
+            fetcher._download_via_api_files()
 
             # Verify warning is logged for failed file
             mock_logger.warning.assert_called_once()
             assert "404" in str(mock_logger.warning.call_args)
 
+    def test_download_via_api_streams_large_blob(self, temp_directory):
+        """Test that blobs are copied to disk in bounded chunks rather than buffered whole."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files")
+        tree_resp = Mock()
+        tree_resp.raise_for_status.return_value = None
+        tree_resp.json.return_value = {"tree": [{"type": "blob", "path": "big.bin"}]}
+        big = blob_response(body=b"x" * (200 * 1024))
+
+        with (
+            patch("requests.Session.get", side_effect=[tree_resp, big]) as mock_get,
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+            patch("gitsage.repo_ingest.repo_fetcher.open", mock_open(), create=True) as mock_file,
+        ):
+            fetcher._download_via_api_files()
+
+        assert mock_get.call_args.kwargs == {"stream": True, "headers": {}}
+        assert big.raw.decode_content is True
+        writes = [call.args[0] for call in mock_file().write.call_args_list]
+        assert len(writes) > 1
+        assert max(len(chunk) for chunk in writes) <= 64 * 1024
+        assert b"".join(writes) == b"x" * (200 * 1024)
+
+    def test_download_via_api_uses_threads_without_aiohttp(self, temp_directory):
+        """Test that blob downloads overlap on a thread pool when aiohttp is unavailable."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", max_concurrency=4)
+        tree_resp = Mock()
+        tree_resp.raise_for_status.return_value = None
+        tree_resp.json.return_value = {"tree": [{"type": "blob", "path": f"f{i}.py"} for i in range(8)]}
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def get(url, **kwargs):
+            if "/git/trees/" in url:
+                return tree_resp
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return blob_response(body=b"x")
+
+        with (
+            patch("requests.Session.get", side_effect=get),
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            fetcher._download_via_api_files()
+
+        assert 1 < state["peak"] <= 4
+        assert sorted(os.listdir(temp_directory)) == sorted(f"f{i}.py" for i in range(8))
+
+    def test_download_via_api_creates_each_directory_once(self):
+        """Test that parent directories are created once up front rather than per file."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", max_concurrency=1)
+        tree_resp = Mock()
+        tree_resp.raise_for_status.return_value = None
+        paths = ["README.md", "src/a.py", "src/b.py", "src/pkg/c.py", "src/pkg/d.py", "docs/e.md"]
+        tree_resp.json.return_value = {"tree": [{"type": "blob", "path": path} for path in paths]}
+
+        with (
+            patch(
+                "requests.Session.get",
+                side_effect=lambda url, **kwargs: tree_resp if "/git/trees/" in url else blob_response(),
+            ),
+            patch("tempfile.mkdtemp", return_value="/tmp/test-repo-12345"),
+            patch("pathlib.Path.mkdir") as mock_mkdir,
+            patch("gitsage.repo_ingest.repo_fetcher.open", mock_open(), create=True),
+        ):
+            fetcher._download_via_api_files()
+
+        assert mock_mkdir.call_count == 3  # docs, src, src/pkg
+
+    def test_iter_files_yields_blobs_as_they_finish(self, temp_directory):
+        """Test that iter_files yields path and content in completion order and skips failed blobs."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", max_concurrency=4)
+        tree_resp = Mock()
+        tree_resp.raise_for_status.return_value = None
+        paths = ["slow.py", "fast.py", "gone.py"]
+        tree_resp.json.return_value = {"tree": [{"type": "blob", "path": path} for path in paths]}
+
+        def get(url, **kwargs):
+            if "/git/trees/" in url:
+                return tree_resp
+            if url.endswith("slow.py"):
+                time.sleep(0.1)
+            return blob_response(404) if url.endswith("gone.py") else blob_response(body=url.rsplit("/", 1)[1].encode())
+
+        with (
+            patch("requests.Session.get", side_effect=get),
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            files = list(fetcher.iter_files())
+
+        assert files == [(temp_directory / "fast.py", b"fast.py"), (temp_directory / "slow.py", b"slow.py")]
+
     def test_download_via_api_http_error(self):
         """Test handling of HTTP errors during API call."""
         repo_url = "https://github.com/user/nonexistent-repo"
-        fetcher = RepoFetcher(repo_url, mode="api")
+        fetcher = RepoFetcher(repo_url, mode="api_files")
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_resp = Mock()
             mock_resp.raise_for_status.side_effect = requests.HTTPError("404 Not Found")
             mock_get.return_value = mock_resp
 
             with pytest.raises(requests.HTTPError):
-                fetcher._download_via_api()
+                fetcher._download_via_api_files()
 
     @patch("gitsage.repo_ingest.repo_fetcher.logger")
     def test_download_via_api_logging(self, mock_logger):
         """Test that appropriate logging messages are generated."""
         repo_url = "https://github.com/user/test-repo"
-        fetcher = RepoFetcher(repo_url, mode="api")
+        fetcher = RepoFetcher(repo_url, mode="api_files")
 
         mock_tree_response = {"tree": []}
 
-        with patch("requests.get") as mock_get, patch("tempfile.mkdtemp", return_value="/tmp/test-repo-12345"):
+        with patch("requests.Session.get") as mock_get, patch("tempfile.mkdtemp", return_value="/tmp/test-repo-12345"):
 
             mock_resp = Mock()
             mock_resp.raise_for_status.return_value = None
             mock_resp.json.return_value = mock_tree_response
             mock_get.return_value = mock_resp
 
-            fetcher._download_via_api()
+            fetcher._download_via_api_files()
 
             # Verify logging calls
             mock_logger.info.assert_called()
@@ -373,22 +1089,597 @@ class TestRepoFetcherAPI:
         ]
 
         for repo_url, expected_owner, expected_repo in test_cases:
-            fetcher = RepoFetcher(repo_url, mode="api")
+            fetcher = RepoFetcher(repo_url, mode="api_files")
 
-            with patch("requests.get") as mock_get, patch("tempfile.mkdtemp", return_value="/tmp/temp"):
+            with patch("requests.Session.get") as mock_get, patch("tempfile.mkdtemp", return_value="/tmp/temp"):
 
                 mock_resp = Mock()
                 mock_resp.raise_for_status.return_value = None
                 mock_resp.json.return_value = {"tree": []}
                 mock_get.return_value = mock_resp
 
-                fetcher._download_via_api()
+                fetcher._download_via_api_files()
 
                 # Verify correct API URL is constructed
                 expected_api_url = (
                     f"https://api.github.com/repos/{expected_owner}/{expected_repo}/git/trees/HEAD?recursive=1"
                 )
-                mock_get.assert_called_with(expected_api_url, headers={})
+                mock_get.assert_called_with(expected_api_url)
+
+
+class FakeBlobResponse:
+    """Minimal stand-in for an aiohttp response context manager."""
+
+    def __init__(self, status, body=b"", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.content = self
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.body), size):
+            yield self.body[start:][:size]
+
+    async def read(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeClientError(Exception):
+    """Stand-in for aiohttp.ClientError."""
+
+
+class FakeClientSession:
+    """Minimal stand-in for aiohttp.ClientSession that records peak concurrency."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.urls = []
+        self.get_kwargs = []
+        self.in_flight = 0
+        self.peak = 0
+
+    def __call__(self, **kwargs):
+        self.kwargs = kwargs
+        return self
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        self.get_kwargs.append(kwargs)
+        if isinstance(self.responses[url], Exception):
+            raise self.responses[url]
+        session = self
+
+        class _Tracked(FakeBlobResponse):
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.peak = max(session.peak, session.in_flight)
+                await asyncio.sleep(0)
+                return self
+
+            async def __aexit__(self, *exc_info):
+                session.in_flight -= 1
+                return False
+
+        return _Tracked(*self.responses[url])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class TestRepoFetcherGraphQL:
+    """Test cases for batching text blobs through the GraphQL API."""
+
+    @pytest.fixture
+    def tree(self):
+        """Mock a tree listing of one text file, one binary file and one that GraphQL cannot see."""
+        with patch("requests.Session.get") as mock_get:
+            tree_resp = Mock()
+            tree_resp.raise_for_status.return_value = None
+            tree_resp.json.return_value = {
+                "tree": [
+                    {"type": "blob", "path": "src/main.py"},
+                    {"type": "blob", "path": "logo.png"},
+                    {"type": "blob", "path": "gone.txt"},
+                ]
+            }
+            mock_get.side_effect = lambda url, **kwargs: (
+                tree_resp if "/git/trees/" in url else blob_response(body=b"\x89PNG")
+            )
+            yield mock_get
+
+    @pytest.fixture
+    def mock_post(self):
+        """Mock the GraphQL endpoint."""
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value = Mock(
+                status_code=200,
+                json=Mock(
+                    return_value={
+                        "data": {
+                            "repository": {
+                                "f0": {
+                                    "oid": hashlib.sha1(b"blob 12\0print('hi')\n").hexdigest(),
+                                    "isBinary": False,
+                                    "isTruncated": False,
+                                    "text": "print('hi')\n",
+                                },
+                                "f1": {"isBinary": True, "isTruncated": False, "text": None},
+                                "f2": None,
+                            }
+                        }
+                    }
+                ),
+            )
+            yield mock_post
+
+    def test_text_blobs_batched_into_one_query(self, tree, mock_post):
+        """Test that one GraphQL request covers the batch and text blobs are written from it."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", token="test_token")
+
+        result = fetcher.fetch()
+
+        mock_post.assert_called_once()
+        payload = mock_post.call_args.kwargs["json"]
+        assert payload["variables"] == {"owner": "user", "name": "test-repo"}
+        assert 'f0: object(expression: "HEAD:src/main.py")' in payload["query"]
+        assert (Path(result) / "src" / "main.py").read_text() == "print('hi')\n"
+        shutil.rmtree(result)
+
+    def test_binary_and_missing_blobs_fall_back_to_contents_api(self, tree, mock_post):
+        """Test that blobs GraphQL cannot return as text are downloaded raw from the contents API."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", token="test_token")
+
+        result = fetcher.fetch()
+
+        blob_calls = [call for call in tree.call_args_list if "/contents/" in call.args[0]]
+        assert {call.args[0] for call in blob_calls} == {
+            "https://api.github.com/repos/user/test-repo/contents/logo.png?ref=HEAD",
+            "https://api.github.com/repos/user/test-repo/contents/gone.txt?ref=HEAD",
+        }
+        assert all(call.kwargs["headers"] == {"Accept": "application/vnd.github.raw"} for call in blob_calls)
+        assert (Path(result) / "logo.png").read_bytes() == b"\x89PNG"
+        shutil.rmtree(result)
+
+    def test_reencoded_text_falls_back_to_contents_api(self, tree, mock_post):
+        """Test that GraphQL text whose bytes do not hash to the blob oid is downloaded raw instead."""
+        objects = mock_post.return_value.json.return_value["data"]["repository"]
+        objects["f0"]["text"] = "print('h\ufffd')\n"
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", token="test_token")
+
+        result = fetcher.fetch()
+
+        blob_urls = {call.args[0] for call in tree.call_args_list if "/contents/" in call.args[0]}
+        assert "https://api.github.com/repos/user/test-repo/contents/src/main.py?ref=HEAD" in blob_urls
+        assert (Path(result) / "src" / "main.py").read_bytes() == b"\x89PNG"
+        shutil.rmtree(result)
+
+    def test_graphql_skipped_without_token(self, tree, mock_post):
+        """Test that anonymous fetches never call GraphQL, which requires auth."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files")
+
+        result = fetcher.fetch()
+
+        mock_post.assert_not_called()
+        shutil.rmtree(result)
+
+    def test_graphql_error_falls_back_to_contents_api(self, tree, mock_post):
+        """Test that a failed GraphQL request leaves the whole batch to the per-blob download."""
+        mock_post.return_value = Mock(status_code=502)
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", token="test_token")
+
+        result = fetcher.fetch()
+
+        blob_calls = [call for call in tree.call_args_list if "/contents/" in call.args[0]]
+        assert len(blob_calls) == 3
+        shutil.rmtree(result)
+
+
+class TestRepoFetcherAPIAsync:
+    """Test cases for concurrent blob downloads through aiohttp."""
+
+    RAW = "https://raw.githubusercontent.com/user/test-repo/HEAD/"
+    CONTENTS = "https://api.github.com/repos/user/test-repo/contents/"
+
+    @pytest.fixture
+    def tree_response(self):
+        """Mock the tree listing returned by the GitHub API."""
+        with patch("requests.Session.get") as mock_get:
+            mock_resp = Mock()
+            mock_resp.raise_for_status.return_value = None
+            mock_resp.json.return_value = {
+                "tree": [
+                    {"type": "blob", "path": "README.md"},
+                    {"type": "tree", "path": "src"},
+                    {"type": "blob", "path": "src/main.py"},
+                    {"type": "blob", "path": "missing.txt"},
+                ]
+            }
+            mock_get.return_value = mock_resp
+            yield mock_get
+
+    def _run(self, session, **fetcher_kwargs):
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", **fetcher_kwargs)
+        with patch(
+            "gitsage.repo_ingest.repo_fetcher.aiohttp", Mock(ClientSession=session, ClientError=FakeClientError)
+        ):
+            return fetcher._download_via_api_files()
+
+    def test_blobs_downloaded_through_one_session(self, tree_response):
+        """Test that blobs are fetched with aiohttp and written under the temp dir."""
+        session = FakeClientSession(
+            {
+                self.CONTENTS + "README.md?ref=HEAD": (200, b"# Test"),
+                self.CONTENTS + "src/main.py?ref=HEAD": (200, b"print('hi')"),
+                self.CONTENTS + "missing.txt?ref=HEAD": (404,),
+            }
+        )
+
+        with patch.object(RepoFetcher, "_download_blobs_graphql", side_effect=lambda *args: args[3]):
+            result = self._run(session, token="test_token")
+
+        assert tree_response.call_count == 1
+        assert session.kwargs == {"headers": {"Authorization": "token test_token"}}
+        assert all(kwargs == {"headers": {"Accept": "application/vnd.github.raw"}} for kwargs in session.get_kwargs)
+        assert (Path(result) / "README.md").read_bytes() == b"# Test"
+        assert (Path(result) / "src" / "main.py").read_bytes() == b"print('hi')"
+        assert not (Path(result) / "missing.txt").exists()
+        shutil.rmtree(result)
+
+    def test_token_pool_rotated_per_blob(self, tree_response):
+        """Test that pooled tokens are picked per blob and their rate-limit headers recorded."""
+        limited = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"}
+        session = FakeClientSession(
+            {
+                self.CONTENTS + "README.md?ref=HEAD": (200, b"# Test", limited),
+                self.CONTENTS + "src/main.py?ref=HEAD": (200, b"print('hi')", limited),
+                self.CONTENTS + "missing.txt?ref=HEAD": (200, b"", limited),
+            }
+        )
+
+        with patch.object(RepoFetcher, "_download_blobs_graphql", side_effect=lambda *args: args[3]):
+            result = self._run(session, tokens=["AAA", "BBB"], max_concurrency=1)
+
+        used = [kwargs["headers"]["Authorization"] for kwargs in session.get_kwargs]
+        assert used == ["token AAA", "token BBB", "token AAA"]
+        shutil.rmtree(result)
+
+    def test_non_200_blob_logged_and_skipped(self, tree_response):
+        """Test that failed blobs are logged without aborting the download."""
+        session = FakeClientSession(
+            {
+                self.RAW + "README.md": (200, b"# Test"),
+                self.RAW + "src/main.py": (200, b""),
+                self.RAW + "missing.txt": (404,),
+            }
+        )
+
+        with patch("gitsage.repo_ingest.repo_fetcher.logger") as mock_logger:
+            result = self._run(session)
+
+        mock_logger.warning.assert_called_once()
+        assert "404" in str(mock_logger.warning.call_args)
+        mock_logger.success.assert_called_once()
+        shutil.rmtree(result)
+
+    def test_retryable_failures_fall_back_to_requests(self, tree_response):
+        """Test that 5xx responses and client errors are retried through the requests session, not skipped."""
+        session = FakeClientSession(
+            {
+                self.RAW + "README.md": (200, b"# Test"),
+                self.RAW + "src/main.py": (503,),
+                self.RAW + "missing.txt": FakeClientError("connection reset"),
+            }
+        )
+
+        with patch.object(RepoFetcher, "_fetch_one", return_value=True) as mock_fetch_one:
+            result = self._run(session)
+
+        retried = sorted(call.args[3] for call in mock_fetch_one.call_args_list)
+        assert retried == ["missing.txt", "src/main.py"]
+        assert (Path(result) / "README.md").read_bytes() == b"# Test"
+        shutil.rmtree(result)
+
+    def test_local_write_errors_propagate(self, tree_response, temp_directory):
+        """Test that a failing disk write aborts the download instead of being logged as a skipped blob."""
+        session = FakeClientSession(
+            {
+                self.RAW + "README.md": (200, b"# Test"),
+                self.RAW + "src/main.py": (200, b"print('hi')"),
+                self.RAW + "missing.txt": (200, b""),
+            }
+        )
+
+        with (
+            patch("gitsage.repo_ingest.repo_fetcher.open", create=True, side_effect=OSError(28, "No space left")),
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            with pytest.raises(OSError, match="No space left"):
+                self._run(session)
+
+    def test_concurrency_bounded_by_semaphore(self, tree_response):
+        """Test that no more than max_concurrency requests are in flight."""
+        session = FakeClientSession(
+            {
+                self.RAW + "README.md": (200, b"a"),
+                self.RAW + "src/main.py": (200, b"b"),
+                self.RAW + "missing.txt": (200, b"c"),
+            }
+        )
+
+        result = self._run(session, max_concurrency=2)
+
+        assert len(session.urls) == 3
+        assert session.peak == 2
+        shutil.rmtree(result)
+
+    def test_iter_files_streams_from_inside_a_running_loop(self, tree_response, temp_directory):
+        """Test that aiohttp downloads still run when iter_files is consumed from async code."""
+        session = FakeClientSession(
+            {
+                self.RAW + "README.md": (200, b"# Test"),
+                self.RAW + "src/main.py": (200, b"print('hi')"),
+                self.RAW + "missing.txt": (404,),
+            }
+        )
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files")
+
+        async def consume():
+            return dict(fetcher.iter_files())
+
+        with (
+            patch("gitsage.repo_ingest.repo_fetcher.aiohttp", Mock(ClientSession=session)),
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            files = asyncio.run(consume())
+
+        assert len(session.urls) == 3
+        assert files == {temp_directory / "README.md": b"# Test", temp_directory / "src" / "main.py": b"print('hi')"}
+
+
+class TestRepoFetcherAPIHTTP2:
+    """Test cases for blob downloads multiplexed over HTTP/2 with httpx."""
+
+    def test_blobs_downloaded_through_one_http2_client(self, temp_directory):
+        """Test that every blob goes through a single http2 client and failed blobs are skipped."""
+        httpx = pytest.importorskip("httpx")
+        tree_resp = Mock()
+        tree_resp.raise_for_status.return_value = None
+        tree_resp.json.return_value = {"tree": [{"type": "blob", "path": p} for p in ("a.py", "src/b.py", "gone.py")]}
+        requested = []
+
+        def handler(request):
+            requested.append(str(request.url))
+            if request.url.path.endswith("gone.py"):
+                return httpx.Response(404)
+            return httpx.Response(200, content=request.url.path.encode())
+
+        clients = []
+
+        def make_client(**kwargs):
+            clients.append(kwargs)
+            return httpx.Client(transport=httpx.MockTransport(handler), headers=kwargs["headers"])
+
+        fake_httpx = Mock(Client=make_client, Limits=httpx.Limits, TransportError=httpx.TransportError)
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", max_concurrency=4)
+        with (
+            patch("gitsage.repo_ingest.repo_fetcher.httpx", fake_httpx),
+            patch("requests.Session.get", return_value=tree_resp),
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            fetcher._download_via_api_files()
+
+        assert len(clients) == 1 and clients[0]["http2"] is True
+        assert sorted(requested) == [
+            "https://raw.githubusercontent.com/user/test-repo/HEAD/a.py",
+            "https://raw.githubusercontent.com/user/test-repo/HEAD/gone.py",
+            "https://raw.githubusercontent.com/user/test-repo/HEAD/src/b.py",
+        ]
+        assert (temp_directory / "src" / "b.py").read_bytes() == b"/user/test-repo/HEAD/src/b.py"
+        assert not (temp_directory / "gone.py").exists()
+
+    def test_redirects_followed_and_retryable_failures_sent_to_requests(self, temp_directory):
+        """Test that renamed-repo redirects are followed and 5xx or pool failures fall back to the retrying session."""
+        httpx = pytest.importorskip("httpx")
+        tree_resp = Mock()
+        tree_resp.raise_for_status.return_value = None
+        tree_resp.json.return_value = {
+            "tree": [{"type": "blob", "path": p} for p in ("moved.py", "busy.py", "pool.py")]
+        }
+
+        def handler(request):
+            path = request.url.path
+            if path == "/new/moved.py":
+                return httpx.Response(200, content=b"moved")
+            if path.endswith("/moved.py"):
+                return httpx.Response(301, headers={"Location": "https://raw.githubusercontent.com/new/moved.py"})
+            if path.endswith("/busy.py"):
+                return httpx.Response(503)
+            raise httpx.PoolTimeout("no connection available")
+
+        def make_client(**kwargs):
+            return httpx.Client(
+                transport=httpx.MockTransport(handler),
+                headers=kwargs["headers"],
+                follow_redirects=kwargs["follow_redirects"],
+            )
+
+        fake_httpx = Mock(Client=make_client, Limits=httpx.Limits, TransportError=httpx.TransportError)
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", max_concurrency=4)
+        with (
+            patch("gitsage.repo_ingest.repo_fetcher.httpx", fake_httpx),
+            patch(
+                "requests.Session.get",
+                side_effect=lambda url, **kwargs: (
+                    tree_resp if "/git/trees/" in url else blob_response(body=url.rsplit("/", 1)[1].encode())
+                ),
+            ) as mock_get,
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            fetcher._download_via_api_files()
+
+        retried = sorted(call.args[0] for call in mock_get.call_args_list if "/git/trees/" not in call.args[0])
+        assert retried == [
+            "https://raw.githubusercontent.com/user/test-repo/HEAD/busy.py",
+            "https://raw.githubusercontent.com/user/test-repo/HEAD/pool.py",
+        ]
+        assert (temp_directory / "moved.py").read_bytes() == b"moved"
+        assert (temp_directory / "busy.py").read_bytes() == b"busy.py"
+        assert (temp_directory / "pool.py").read_bytes() == b"pool.py"
+
+    def test_token_pool_rotated_per_blob(self, temp_directory):
+        """Test that pooled tokens are picked per blob and rate-limit headers from the client are recorded."""
+        httpx = pytest.importorskip("httpx")
+        tree_resp = Mock()
+        tree_resp.raise_for_status.return_value = None
+        tree_resp.json.return_value = {"tree": [{"type": "blob", "path": p} for p in ("a.py", "b.py", "c.py")]}
+        used = []
+
+        def handler(request):
+            used.append(request.headers["Authorization"])
+            return httpx.Response(200, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"})
+
+        def make_client(**kwargs):
+            return httpx.Client(transport=httpx.MockTransport(handler), headers=kwargs["headers"])
+
+        fake_httpx = Mock(Client=make_client, Limits=httpx.Limits, TransportError=httpx.TransportError)
+        fetcher = RepoFetcher(
+            "https://github.com/user/test-repo", mode="api_files", tokens=["AAA", "BBB"], max_concurrency=1
+        )
+        with (
+            patch("gitsage.repo_ingest.repo_fetcher.httpx", fake_httpx),
+            patch.object(RepoFetcher, "_download_blobs_graphql", side_effect=lambda *args: args[3]),
+            patch("requests.Session.get", return_value=tree_resp),
+            patch("tempfile.mkdtemp", return_value=str(temp_directory)),
+        ):
+            fetcher._download_via_api_files()
+
+        assert used == ["token AAA", "token BBB", "token AAA"]
+        assert fetcher._token_state["BBB"]["remaining"] == 0
+
+
+class TestRepoFetcherResponseCache:
+    """Test cases for the commit-pinned API response cache."""
+
+    SHA = "c" * 40
+    BLOB = b"print('hi')"
+    BLOB_SHA = hashlib.sha1(b"blob 11\0print('hi')").hexdigest()
+
+    @pytest.fixture
+    def head(self):
+        """Mutable HEAD of the fake repository."""
+        return {"sha": self.SHA, "blob_sha": self.BLOB_SHA}
+
+    @pytest.fixture
+    def github(self, head):
+        """Fake GitHub: revalidates HEAD by ETag and serves sha-pinned tarball, tree and blob URLs."""
+        calls = []
+        tarball = TestRepoFetcherTarball._tarball([("user-test-repo-ccc/README.md", b"# Test")]).getvalue()
+
+        def get(url, headers=None, stream=False):
+            calls.append((url, headers))
+            resp = MagicMock()
+            resp.raise_for_status.return_value = None
+            resp.status_code = 200
+            etag = f'"etag-{head["sha"]}"'
+            tree = {"tree": [{"type": "blob", "path": "src/main.py", "sha": head["blob_sha"]}]}
+            if url.endswith("/commits/HEAD"):
+                if headers and headers.get("If-None-Match") == etag:
+                    resp.status_code = 304
+                resp.text = head["sha"]
+                resp.headers = {"ETag": etag}
+            elif url.endswith(f"/tarball/{head['sha']}"):
+                resp.raw = io.BytesIO(tarball)
+            elif f"/git/trees/{head['sha']}" in url:
+                resp.content = json.dumps(tree).encode()
+                resp.json.return_value = tree
+            elif url.endswith(f"/{head['sha']}/src/main.py"):
+                resp = blob_response(body=self.BLOB)
+            else:
+                resp.status_code = 404
+            return resp
+
+        with patch("requests.Session.get", side_effect=get):
+            yield calls
+
+    def test_head_sha_revalidated_with_etag(self, github, temp_directory):
+        """Test that the second resolve sends If-None-Match and uses the cached sha on 304."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api", cache_dir=str(temp_directory))
+
+        assert fetcher._resolve_head_sha("user", "test-repo") == self.SHA
+        assert fetcher._resolve_head_sha("user", "test-repo") == self.SHA
+
+        first_headers, second_headers = [headers for _, headers in github]
+        assert "If-None-Match" not in first_headers
+        assert second_headers["If-None-Match"] == f'"etag-{self.SHA}"'
+        assert second_headers["Accept"] == "application/vnd.github.sha"
+
+    def test_tarball_downloaded_once_per_sha(self, github, temp_directory):
+        """Test that a repeat fetch at the same commit extracts the cached tarball."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api", cache_dir=str(temp_directory))
+
+        first = fetcher.fetch()
+        second = fetcher.fetch()
+
+        tarball_calls = [url for url, _ in github if "/tarball/" in url]
+        assert tarball_calls == [f"https://api.github.com/repos/user/test-repo/tarball/{self.SHA}"]
+        assert (Path(second) / "README.md").read_bytes() == b"# Test"
+        shutil.rmtree(first)
+        shutil.rmtree(second)
+
+    def test_api_files_served_from_cache(self, github, temp_directory):
+        """Test that sha-pinned tree and blob responses are reused on the next fetch."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", cache_dir=str(temp_directory))
+
+        first = fetcher.fetch()
+        downloads = len(github)
+        second = fetcher.fetch()
+
+        assert [url for url, _ in github[downloads:]] == ["https://api.github.com/repos/user/test-repo/commits/HEAD"]
+        assert (Path(second) / "src" / "main.py").read_bytes() == b"print('hi')"
+        shutil.rmtree(first)
+        shutil.rmtree(second)
+
+    def test_unchanged_blob_not_redownloaded_after_new_commit(self, github, head, temp_directory):
+        """Test that blobs are reused by git object sha even when HEAD has moved."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", cache_dir=str(temp_directory))
+        first = fetcher.fetch()
+        head["sha"] = "d" * 40
+
+        second = fetcher.fetch()
+
+        assert not any(url.startswith("https://raw.githubusercontent.com/user/test-repo/ddd") for url, _ in github)
+        assert (Path(second) / "src" / "main.py").read_bytes() == self.BLOB
+        shutil.rmtree(first)
+        shutil.rmtree(second)
+
+    def test_blob_with_mismatched_sha_not_cached(self, github, head, temp_directory):
+        """Test that content not hashing to the tree's sha never enters the blob store."""
+        head["blob_sha"] = "0" * 40
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files", cache_dir=str(temp_directory))
+
+        result = fetcher.fetch()
+
+        assert not (temp_directory / "blobs").exists()
+        shutil.rmtree(result)
+
+    def test_no_cache_dir_keeps_head_urls(self, github):
+        """Test that without a cache_dir no sha is resolved and HEAD is fetched directly."""
+        fetcher = RepoFetcher("https://github.com/user/test-repo", mode="api_files")
+
+        with patch("tempfile.mkdtemp", return_value="/tmp/test-repo-12345"), patch("pathlib.Path.mkdir"):
+            fetcher.fetch()
+
+        assert github[0][0] == "https://api.github.com/repos/user/test-repo/git/trees/HEAD?recursive=1"
+        assert not any(url.endswith("/commits/HEAD") for url, _ in github)
 
 
 class TestRepoFetcherIntegration:
@@ -401,38 +1692,32 @@ class TestRepoFetcherIntegration:
         with tempfile.TemporaryDirectory() as temp_dir:
             fetcher = RepoFetcher(repo_url, mode="clone", target_dir=temp_dir)
 
-            with patch("gitsage.repo_ingest.repo_fetcher.Repo") as mock_repo:
-                mock_repo.clone_from.return_value = MagicMock()
-
+            with patch("gitsage.repo_ingest.repo_fetcher.subprocess.run"):
                 result = fetcher.fetch()
 
                 expected_path = os.path.join(temp_dir, "test-repo")
                 assert result == expected_path
                 assert os.path.exists(temp_dir)
 
-    def test_api_mode_integration(self):
-        """Test complete API download workflow."""
+    def test_api_files_mode_integration(self):
+        """Test complete per-file API download workflow."""
         repo_url = "https://github.com/user/test-repo"
-        fetcher = RepoFetcher(repo_url, mode="api")
+        fetcher = RepoFetcher(repo_url, mode="api_files")
 
         mock_tree_response = {"tree": [{"type": "blob", "path": "README.md"}]}
 
         with (
-            patch("requests.get") as mock_get,
+            patch("requests.Session.get") as mock_get,
             patch("tempfile.mkdtemp", return_value="/tmp/test-repo-12345"),
             patch("pathlib.Path.mkdir"),
-            patch("pathlib.Path.write_bytes"),
+            patch("gitsage.repo_ingest.repo_fetcher.open", mock_open(), create=True),
         ):
 
             mock_tree_resp = Mock()
             mock_tree_resp.raise_for_status.return_value = None
             mock_tree_resp.json.return_value = mock_tree_response
 
-            mock_file_resp = Mock()
-            mock_file_resp.status_code = 200
-            mock_file_resp.content = b"# Test Repo"
-
-            mock_get.side_effect = [mock_tree_resp, mock_file_resp]
+            mock_get.side_effect = [mock_tree_resp, blob_response(body=b"# Test Repo")]
 
             result = fetcher.fetch()
 
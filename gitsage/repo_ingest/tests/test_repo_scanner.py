@@ -2,13 +2,26 @@
 
 """Unit tests for the file_scanner module."""
 
+import os
+import shutil
+import subprocess
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from ..repo_scanner import SUPPORTED_CODE_EXTS, SUPPORTED_CONFIG_FILES, scan_repo
+from .._git import read_head_sha
+from ..repo_scanner import (
+    SUPPORTED_CODE_EXTS,
+    SUPPORTED_CONFIG_FILES,
+    _scan_cached,
+    iter_repo_files,
+    scan_repo,
+    scan_repo_with,
+)
 
 
 class TestFileScannerConstants:
@@ -98,7 +111,7 @@ class TestScanRepo:
         code_files = result["code_files"]
 
         # Should find all code files
-        code_file_names = [Path(f).name for f in code_files]
+        code_file_names = [os.path.basename(f) for f in code_files]
         expected_code_files = {
             "main.py",
             "utils.js",
@@ -119,7 +132,7 @@ class TestScanRepo:
         config_files = result["config_files"]
 
         # Should find all config files
-        config_file_names = [Path(f).name for f in config_files]
+        config_file_names = [os.path.basename(f) for f in config_files]
         expected_config_files = {
             "README.md",
             "requirements.txt",
@@ -140,7 +153,7 @@ class TestScanRepo:
         all_files = result["code_files"] + result["config_files"]
 
         # Should not include unsupported files
-        file_names = [Path(f).name for f in all_files]
+        file_names = [os.path.basename(f) for f in all_files]
         unsupported_files = {"test.txt", "image.png", "data.csv", "style.css"}
 
         for unsupported_file in unsupported_files:
@@ -155,6 +168,186 @@ class TestScanRepo:
         has_subdir_file = any("src" in f for f in all_files)
         assert has_subdir_file
 
+    def test_scan_repo_parallel_matches_serial(self, temp_repo):
+        """Test that a threaded scan finds the same files as the serial scan."""
+        serial = scan_repo(temp_repo)
+        parallel = scan_repo(temp_repo, max_workers=4)
+
+        assert sorted(parallel["code_files"]) == sorted(serial["code_files"])
+        assert sorted(parallel["config_files"]) == sorted(serial["config_files"])
+
+    def test_scan_repo_parallel_skips_pool_for_small_trees(self, temp_repo):
+        """Test that a threaded scan of a tree with few directories never starts the thread pool."""
+        with patch("gitsage.repo_ingest.repo_scanner.ThreadPoolExecutor") as mock_pool:
+            scan_repo(temp_repo, max_workers=4)
+
+        mock_pool.assert_not_called()
+
+    def test_scan_repo_parallel_with_many_directories(self, temp_repo):
+        """Test that a wide tree is handed to the thread pool and still finds every file."""
+        for i in range(8):
+            (temp_repo / f"pkg{i}").mkdir()
+            (temp_repo / f"pkg{i}" / "mod.py").write_text("x = 1")
+        serial = scan_repo(temp_repo)
+
+        with patch("gitsage.repo_ingest.repo_scanner.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as mock_pool:
+            parallel = scan_repo(temp_repo, max_workers=4)
+
+        mock_pool.assert_called_once_with(max_workers=4)
+        assert sorted(parallel["code_files"]) == sorted(serial["code_files"])
+        assert sorted(parallel["config_files"]) == sorted(serial["config_files"])
+
+    def test_scan_repo_collect_sizes_uses_dir_entries(self, temp_repo):
+        """Test that collect_sizes reports every file's size without a second os.stat by path."""
+        with patch("gitsage.repo_ingest.repo_scanner.os.stat", wraps=os.stat) as mock_stat:
+            result = scan_repo(temp_repo, collect_sizes=True)
+
+        all_files = result["code_files"] + result["config_files"]
+        assert {call.args[0] for call in mock_stat.call_args_list}.isdisjoint(all_files)
+        assert set(result["file_sizes"]) == set(all_files)
+        for file_path in all_files:
+            assert result["file_sizes"][file_path] == os.path.getsize(file_path)
+
+    def test_scan_repo_without_collect_sizes_has_no_sizes(self, temp_repo):
+        """Test that sizes are only reported when asked for."""
+        assert "file_sizes" not in scan_repo(temp_repo)
+
+    def _age_directories(self, root):
+        # Push directory mtimes out of the racy window so their listings may be cached.
+        old = time.time() - 60
+        for dir_path, _, _ in os.walk(root):
+            os.utime(dir_path, (old, old))
+
+    def test_scan_repo_dir_cache_skips_unchanged_directories(self, temp_repo):
+        """Test that a warm dir_cache re-scan stats directories instead of listing them."""
+        self._age_directories(temp_repo)
+        dir_cache = {}
+        first = scan_repo(temp_repo, dir_cache=dir_cache)
+
+        with patch("gitsage.repo_ingest.repo_scanner.os.scandir") as mock_scandir:
+            second = scan_repo(temp_repo, dir_cache=dir_cache)
+
+        mock_scandir.assert_not_called()
+        assert second == first
+
+    def test_scan_repo_dir_cache_picks_up_nested_changes(self, temp_repo):
+        """Test that a file added to a subdirectory is found although the root's mtime did not move."""
+        self._age_directories(temp_repo)
+        dir_cache = {}
+        scan_repo(temp_repo, dir_cache=dir_cache)
+        root_mtime = os.stat(temp_repo).st_mtime_ns
+        (temp_repo / "src" / "added.py").write_text("x = 1")
+
+        result = scan_repo(temp_repo, dir_cache=dir_cache)
+
+        assert os.stat(temp_repo).st_mtime_ns == root_mtime
+        assert sorted(result["code_files"]) == sorted(scan_repo(temp_repo)["code_files"])
+        assert str(temp_repo / "src" / "added.py") in result["code_files"]
+
+    def test_scan_repo_dir_cache_relists_recently_modified_directories(self, temp_repo):
+        """Test that a listing whose mtime is still within the racy window is not cached."""
+        dir_cache = {}
+        scan_repo(temp_repo, dir_cache=dir_cache)
+        src_mtime = os.stat(temp_repo / "src").st_mtime_ns
+        # A coarse timestamp tick: the new entry leaves the directory mtime where it was.
+        (temp_repo / "src" / "added.py").write_text("x = 1")
+        os.utime(temp_repo / "src", ns=(src_mtime, src_mtime))
+
+        result = scan_repo(temp_repo, dir_cache=dir_cache)
+
+        assert str(temp_repo / "src") not in dir_cache
+        assert str(temp_repo / "src" / "added.py") in result["code_files"]
+
+    def test_scan_repo_skips_default_excluded_dirs(self, temp_repo):
+        """Test that vendor, cache and VCS directories are not traversed."""
+        for dir_name in ("node_modules", "__pycache__", ".git", "venv", "target"):
+            (temp_repo / dir_name).mkdir()
+            (temp_repo / dir_name / "skipped.py").write_text("print('skipped')")
+
+        result = scan_repo(temp_repo)
+
+        code_file_names = [os.path.basename(f) for f in result["code_files"]]
+        assert "skipped.py" not in code_file_names
+        assert len(code_file_names) == 7
+
+    def test_scan_repo_custom_exclude_dirs(self, temp_repo):
+        """Test that exclude_dirs replaces the default exclusions."""
+        (temp_repo / "node_modules").mkdir()
+        (temp_repo / "node_modules" / "vendored.js").write_text("module.exports = {}")
+
+        result = scan_repo(temp_repo, exclude_dirs={"src"})
+
+        code_file_names = [os.path.basename(f) for f in result["code_files"]]
+        assert "vendored.js" in code_file_names
+        assert "module.py" not in code_file_names
+
+    def test_iter_repo_files_matches_scan_repo(self, temp_repo):
+        """Test that the streaming iterator yields the same files as scan_repo."""
+        result = scan_repo(temp_repo)
+        streamed = list(iter_repo_files(temp_repo))
+
+        assert sorted(path for category, path in streamed if category == "code") == sorted(result["code_files"])
+        assert sorted(path for category, path in streamed if category == "config") == sorted(result["config_files"])
+
+    def test_iter_repo_files_paths_match_scan_repo_for_relative_root(self, temp_repo, monkeypatch):
+        """Test that both entry points return identical str paths for an un-normalised root."""
+        monkeypatch.chdir(Path(temp_repo).parent)
+        root = f"./{Path(temp_repo).name}/"
+
+        result = scan_repo(root)
+        streamed = list(iter_repo_files(root))
+
+        assert all(isinstance(path, str) for _, path in streamed)
+        assert sorted(path for _, path in streamed) == sorted(result["code_files"] + result["config_files"])
+
+    def test_scan_repo_dot_root_returns_bare_relative_paths(self, temp_repo, monkeypatch):
+        """Test that scanning "." returns "main.py" rather than "./main.py", as Path-joined results did."""
+        monkeypatch.chdir(temp_repo)
+
+        result = scan_repo(".", collect_sizes=True)
+        streamed = list(iter_repo_files("."))
+
+        assert "main.py" in result["code_files"]
+        assert os.path.join("src", "module.py") in result["code_files"]
+        assert not any(path.startswith("./") for path in result["code_files"] + result["config_files"])
+        assert sorted(result["file_sizes"]) == sorted(result["code_files"] + result["config_files"])
+        assert sorted(path for _, path in streamed) == sorted(result["code_files"] + result["config_files"])
+
+    def test_scan_repo_with_matches_scan_repo(self, temp_repo):
+        """Test that the callback API reports the same files as scan_repo."""
+        code_entries, config_entries = [], []
+        scan_repo_with(temp_repo, on_code=code_entries.append, on_config=config_entries.append)
+
+        result = scan_repo(temp_repo)
+        assert sorted(e.path for e in code_entries) == sorted(result["code_files"])
+        assert sorted(e.path for e in config_entries) == sorted(result["config_files"])
+
+    def test_scan_repo_with_passes_dir_entries(self, temp_repo):
+        """Test that callbacks receive DirEntry objects whose stat matches the file."""
+        entries = []
+        scan_repo_with(temp_repo, on_config=entries.append)
+
+        assert entries
+        for entry in entries:
+            assert isinstance(entry, os.DirEntry)
+            assert entry.stat().st_size == os.stat(entry.path).st_size
+
+    def test_scan_repo_with_no_callbacks(self, temp_repo):
+        """Test that omitted callbacks are simply skipped."""
+        code_entries = []
+        scan_repo_with(temp_repo, on_code=code_entries.append)
+
+        assert {e.name for e in code_entries} >= {"main.py"}
+
+    def test_iter_repo_files_is_lazy(self, temp_repo):
+        """Test that the iterator does not walk the tree until consumed."""
+        with patch("gitsage.repo_ingest.repo_scanner._scan_dir") as mock_scan_dir:
+            files = iter_repo_files(temp_repo)
+            mock_scan_dir.assert_not_called()
+            next(files, None)
+
+        mock_scan_dir.assert_called()
+
     def test_scan_repo_empty_directory(self):
         """Test scanning an empty directory."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -193,9 +386,23 @@ class TestScanRepo:
         """Test that appropriate logging messages are generated."""
         scan_repo(temp_repo)
 
-        # Verify logging calls
+        # Verify logging calls (debug output is formatted lazily)
         mock_logger.info.assert_called()
-        mock_logger.debug.assert_called()
+        mock_logger.opt.assert_called_with(lazy=True)
+        mock_logger.opt.return_value.debug.assert_called()
+
+    def test_scan_repo_debug_message_content(self, temp_repo):
+        """Test that the lazily formatted debug message reports the file counts."""
+        from loguru import logger
+
+        messages = []
+        handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="DEBUG")
+        try:
+            scan_repo(temp_repo)
+        finally:
+            logger.remove(handler_id)
+
+        assert "Found 7 code files and 7 config files." in messages
 
     def test_scan_repo_specific_extensions(self, temp_repo):
         """Test that only files with supported extensions are included."""
@@ -203,7 +410,7 @@ class TestScanRepo:
         code_files = result["code_files"]
 
         for file_path in code_files:
-            file_ext = Path(file_path).suffix
+            file_ext = os.path.splitext(file_path)[1]
             assert file_ext in SUPPORTED_CODE_EXTS
 
     def test_scan_repo_case_sensitivity(self):
@@ -220,7 +427,7 @@ class TestScanRepo:
             code_files = result["code_files"]
 
             # Should only find files with lowercase extensions (as defined in SUPPORTED_CODE_EXTS)
-            code_file_names = [Path(f).name for f in code_files]
+            code_file_names = [os.path.basename(f) for f in code_files]
             assert "script.py" in code_file_names
             assert "Script.PY" not in code_file_names
             assert "app.JS" not in code_file_names
@@ -239,7 +446,7 @@ class TestScanRepo:
             code_files = result["code_files"]
 
             assert len(code_files) == 3
-            file_names = [Path(f).name for f in code_files]
+            file_names = [os.path.basename(f) for f in code_files]
             assert "file-with-dashes.py" in file_names
             assert "file_with_underscores.js" in file_names
             assert "file with spaces.ts" in file_names
@@ -293,7 +500,7 @@ class TestScanRepo:
 
             # Verify specific files
             all_files = result["code_files"] + result["config_files"]
-            all_file_names = [Path(f).name for f in all_files]
+            all_file_names = [os.path.basename(f) for f in all_files]
 
             assert "app.py" in all_file_names
             assert "script.js" in all_file_names
@@ -302,3 +509,247 @@ class TestScanRepo:
             assert "data.csv" not in all_file_names
             assert "image.png" not in all_file_names
             assert "notes.txt" not in all_file_names
+
+    def test_scan_repo_skips_symlinks(self, temp_repo):
+        """Test that symlinked files and directories are not followed."""
+        with tempfile.TemporaryDirectory() as outside_dir:
+            (Path(outside_dir) / "outside.py").write_text("print('outside')")
+            (temp_repo / "linked_dir").symlink_to(outside_dir, target_is_directory=True)
+            (temp_repo / "linked.py").symlink_to(temp_repo / "main.py")
+
+            result = scan_repo(temp_repo)
+            code_file_names = [os.path.basename(f) for f in result["code_files"]]
+
+            assert "outside.py" not in code_file_names
+            assert "linked.py" not in code_file_names
+            assert "main.py" in code_file_names
+
+    def test_scan_repo_extension_matches_path_suffix(self):
+        """Test that extension matching follows Path.suffix semantics."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = Path(temp_dir)
+
+            (repo_path / ".py").write_text("")  # dotfile, no suffix
+            (repo_path / "archive.tar.go").write_text("")  # last suffix wins
+            (repo_path / "trailing.").write_text("")
+
+            result = scan_repo(temp_dir)
+            code_file_names = [os.path.basename(f) for f in result["code_files"]]
+
+            assert code_file_names == ["archive.tar.go"]
+
+
+class TestScanRepoCache:
+    """Test cases for the on-disk scan cache."""
+
+    @pytest.fixture
+    def git_repo(self):
+        """Create a repository with a minimal .git directory pointing HEAD at a commit."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = Path(temp_dir) / "repo"
+            (repo_path / ".git" / "refs" / "heads").mkdir(parents=True)
+            (repo_path / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+            (repo_path / ".git" / "refs" / "heads" / "main").write_text("a" * 40 + "\n")
+            (repo_path / "main.py").write_text("print('hello')")
+            (repo_path / "README.md").write_text("# Test")
+            yield repo_path
+
+    def test_read_head_sha_loose_ref(self, git_repo):
+        """Test resolving HEAD through a loose branch ref."""
+        assert read_head_sha(str(git_repo)) == "a" * 40
+
+    def test_read_head_sha_packed_ref(self, git_repo):
+        """Test resolving HEAD through packed-refs."""
+        (git_repo / ".git" / "refs" / "heads" / "main").unlink()
+        (git_repo / ".git" / "packed-refs").write_text(f"# pack-refs with: peeled\n{'b' * 40} refs/heads/main\n")
+
+        assert read_head_sha(str(git_repo)) == "b" * 40
+
+    def test_read_head_sha_without_git_dir(self, temp_directory):
+        """Test that non-git directories have no HEAD."""
+        assert read_head_sha(str(temp_directory)) is None
+
+    def test_scan_repo_cache_hit_skips_walk(self, git_repo, temp_directory):
+        """Test that a second scan at the same HEAD is served from the cache."""
+        first = scan_repo(git_repo, cache_dir=temp_directory)
+        assert len(list(temp_directory.glob("*.json"))) == 1
+
+        with patch("gitsage.repo_ingest.repo_scanner._iter_batches") as mock_walk:
+            second = scan_repo(git_repo, cache_dir=temp_directory)
+
+        mock_walk.assert_not_called()
+        assert second == first
+
+    def test_scan_repo_cache_reloads_from_disk(self, git_repo, temp_directory):
+        """Test that a fresh process (empty in-memory cache) is served from the cache file."""
+        first = scan_repo(git_repo, cache_dir=temp_directory)
+        _scan_cached.cache_clear()
+
+        with patch("gitsage.repo_ingest.repo_scanner._iter_batches") as mock_walk:
+            second = scan_repo(git_repo, cache_dir=temp_directory)
+
+        mock_walk.assert_not_called()
+        assert second == first
+
+    def test_scan_repo_repeat_scan_skips_cache_file(self, git_repo, temp_directory):
+        """Test that repeated scans in one process do not re-read the cache file."""
+        scan_repo(git_repo, cache_dir=temp_directory)
+
+        with patch("gitsage.repo_ingest.repo_scanner.json.load") as mock_load:
+            scan_repo(git_repo, cache_dir=temp_directory)
+
+        mock_load.assert_not_called()
+
+    def test_scan_repo_cached_result_is_a_copy(self, git_repo, temp_directory):
+        """Test that mutating a returned result does not leak into later scans."""
+        first = scan_repo(git_repo, cache_dir=temp_directory)
+        first["code_files"].append("bogus.py")
+
+        second = scan_repo(git_repo, cache_dir=temp_directory)
+
+        assert "bogus.py" not in second["code_files"]
+
+    def test_scan_repo_cache_invalidated_by_new_head(self, git_repo, temp_directory):
+        """Test that moving HEAD produces a fresh scan."""
+        scan_repo(git_repo, cache_dir=temp_directory)
+        (git_repo / ".git" / "refs" / "heads" / "main").write_text("c" * 40 + "\n")
+        (git_repo / "extra.py").write_text("print('new')")
+
+        result = scan_repo(git_repo, cache_dir=temp_directory)
+
+        assert len(result["code_files"]) == 2
+        assert len(list(temp_directory.glob("*.json"))) == 2
+
+    def test_scan_repo_cache_keeps_sizes(self, git_repo, temp_directory):
+        """Test that sizes are cached separately and served from the cache file."""
+        first = scan_repo(git_repo, cache_dir=temp_directory, collect_sizes=True)
+        _scan_cached.cache_clear()
+
+        with patch("gitsage.repo_ingest.repo_scanner._iter_batches") as mock_walk:
+            second = scan_repo(git_repo, cache_dir=temp_directory, collect_sizes=True)
+
+        mock_walk.assert_not_called()
+        assert second == first
+        assert second["file_sizes"][str(git_repo / "README.md")] == len("# Test")
+        assert "file_sizes" not in scan_repo(git_repo, cache_dir=temp_directory)
+
+    def test_scan_repo_no_cache_without_head(self, temp_directory):
+        """Test that directories without a git HEAD are never cached."""
+        with tempfile.TemporaryDirectory() as repo_dir:
+            (Path(repo_dir) / "main.py").write_text("print('hello')")
+            scan_repo(repo_dir, cache_dir=temp_directory)
+
+        assert list(temp_directory.iterdir()) == []
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git executable not available")
+class TestScanRepoGitListing:
+    """Test cases for enumerating files through git ls-files."""
+
+    @pytest.fixture
+    def git_repo(self):
+        """Create a real git repository with tracked, untracked and ignored files."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = Path(temp_dir)
+            subprocess.run(["git", "init", "-q", str(repo_path)], check=True)
+
+            (repo_path / "main.py").write_text("print('hello')")
+            (repo_path / "README.md").write_text("# Test")
+            (repo_path / ".gitignore").write_text("ignored/\n")
+            (repo_path / "src").mkdir()
+            (repo_path / "src" / "module.py").write_text("def func(): pass")
+            (repo_path / "ignored").mkdir()
+            (repo_path / "ignored" / "skip.py").write_text("print('ignored')")
+            subprocess.run(["git", "-C", str(repo_path), "add", "main.py", "README.md", ".gitignore"], check=True)
+
+            yield repo_path
+
+    def test_scan_repo_walks_git_repositories_by_default(self, git_repo):
+        """Test that the git listing is opt-in, so a .git directory does not change default results."""
+        with patch("gitsage.repo_ingest.repo_scanner.subprocess.run") as mock_run:
+            result = scan_repo(git_repo)
+
+        mock_run.assert_not_called()
+        code_file_names = {os.path.basename(f) for f in result["code_files"]}
+        assert code_file_names == {"main.py", "module.py", "skip.py"}
+
+    def test_scan_repo_uses_git_listing(self, git_repo):
+        """Test that git repositories are listed via git instead of a directory walk."""
+        with patch("gitsage.repo_ingest.repo_scanner._scan_dir") as mock_walk:
+            result = scan_repo(git_repo, use_git=True)
+
+        mock_walk.assert_not_called()
+        code_file_names = {os.path.basename(f) for f in result["code_files"]}
+        config_file_names = {os.path.basename(f) for f in result["config_files"]}
+        assert code_file_names == {"main.py", "module.py"}
+        assert config_file_names == {"README.md", ".gitignore"}
+
+    def test_scan_repo_git_listing_collect_sizes(self, git_repo):
+        """Test that git-listed files get their sizes from one stat each."""
+        result = scan_repo(git_repo, collect_sizes=True, use_git=True)
+
+        assert result["file_sizes"] == {
+            file_path: os.path.getsize(file_path) for file_path in result["code_files"] + result["config_files"]
+        }
+
+    def test_scan_repo_git_listing_returns_joined_paths(self, git_repo):
+        """Test that git-listed files are returned as paths under the repository root."""
+        result = scan_repo(git_repo, use_git=True)
+
+        for file_path in result["code_files"] + result["config_files"]:
+            assert file_path.startswith(str(git_repo))
+            assert Path(file_path).is_file()
+
+    def test_scan_repo_git_listing_dot_root_returns_bare_relative_paths(self, git_repo, monkeypatch):
+        """Test that git-listed files under a "." root carry no "./" prefix either."""
+        monkeypatch.chdir(git_repo)
+
+        result = scan_repo(".", use_git=True)
+
+        assert sorted(result["code_files"]) == ["main.py", os.path.join("src", "module.py")]
+
+    def test_scan_repo_falls_back_to_walk_when_git_fails(self, git_repo):
+        """Test that the directory walk is used when git cannot list the repository."""
+        with patch("gitsage.repo_ingest.repo_scanner.subprocess.run", side_effect=FileNotFoundError("git")):
+            result = scan_repo(git_repo, use_git=True)
+
+        code_file_names = {os.path.basename(f) for f in result["code_files"]}
+        assert {"main.py", "module.py", "skip.py"} <= code_file_names
+
+    def test_scan_repo_git_listing_matches_walk(self, git_repo):
+        """Test that deleted tracked files and symlinks are dropped so the git listing matches the walk."""
+        (git_repo / "gone.py").write_text("print('gone')")
+        (git_repo / "link.py").symlink_to("main.py")
+        subprocess.run(["git", "-C", str(git_repo), "add", "gone.py", "link.py"], check=True)
+        (git_repo / "gone.py").unlink()
+        shutil.rmtree(git_repo / "ignored")
+
+        listed = scan_repo(git_repo, use_git=True)
+        walked = scan_repo(git_repo)
+
+        assert sorted(listed["code_files"]) == sorted(walked["code_files"])
+        assert sorted(listed["config_files"]) == sorted(walked["config_files"])
+
+    def test_scan_repo_git_listing_leaves_out_ignored_config(self, git_repo):
+        """Test that a gitignored .env is not listed, unlike in the walk, which has no ignore rules."""
+        (git_repo / ".gitignore").write_text("ignored/\n.env\n")
+        (git_repo / ".env").write_text("SECRET=1")
+
+        result = scan_repo(git_repo, use_git=True)
+
+        config_file_names = {os.path.basename(f) for f in result["config_files"]}
+        assert ".env" not in config_file_names
+        assert ".gitignore" in config_file_names
+
+    def test_scan_repo_git_listing_honours_exclude_dirs(self, git_repo):
+        """Test that tracked files under excluded directories are dropped."""
+        vendor_dir = git_repo / "lib" / "node_modules"
+        vendor_dir.mkdir(parents=True)
+        (vendor_dir / "vendored.js").write_text("module.exports = {}")
+        subprocess.run(["git", "-C", str(git_repo), "add", "lib"], check=True)
+
+        result = scan_repo(git_repo, use_git=True)
+
+        code_file_names = {os.path.basename(f) for f in result["code_files"]}
+        assert "vendored.js" not in code_file_names
+        assert "main.py" in code_file_names